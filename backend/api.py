@@ -1,18 +1,60 @@
 import os
 import time
+import asyncio
 import shutil
 import traceback
 import json
-from typing import List, Dict, Any, Optional
+import sqlite3
+from urllib.parse import urlencode
+from typing import List, Dict, Any, Optional, Tuple
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-
-from utils.pdf import pdf_to_documents
-from utils.embedding import build_vector_store
-from utils.rag import process_question, generate_mc_questions
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+
+from utils.pdf import PdfParseError, iter_pdf_documents
+from utils.embedding import build_vector_store, index_lock
+from utils.index_manifest import (
+    file_sha256,
+    is_indexed,
+    load_manifest,
+    find_source_by_hash,
+    indexed_chunk_hashes,
+)
+from utils.upload import (
+    UPLOAD_MAX_BYTES,
+    UploadTooLarge,
+    safe_filename,
+    stream_to_file,
+    commit_upload,
+    discard_upload,
+)
+from utils.dedup import ChunkDeduper
+from utils.rag import aprocess_question, stream_question
+from utils.mcq import generate_mc_questions, iter_mc_questions
+from utils.store_cache import get_vector_store, invalidate_vector_store, store_cache_stats
+from utils.lexical import build_lexical_index
+from utils.ann import INDEX_TYPES
+from utils.federated import federated_search
+from utils.org_tree import OrgTree
+from utils.bot_manifest import BotRegistry
+from utils.employee_store import get_employee_store
+from utils.embed_cache import embedding_cache_stats
+from utils.answer_cache import answer_cache_stats, invalidate_answers
+from utils.metrics import get_recorder, latency_snapshot, token_usage_snapshot
+from utils.jobs import Job, JobCancelled, QueueFull, get_job_manager
+from utils.qna_store import get_qna_store, drop_qna_stores
+from utils.history import session_cache_stats
+from utils.page_images import (
+    VARIANT_DPI,
+    get_page_image_cache,
+    page_image_stats,
+    resolve_dpi,
+    start_render_pool,
+)
 
 app = FastAPI()
 
@@ -24,6 +66,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# multipart 경계/폼 필드에 허용할 여유분
+UPLOAD_FORM_OVERHEAD = 1024 * 1024
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """본문을 받기 전에 Content-Length로 업로드 크기 제한 (초과 시 413)"""
+    if request.url.path == "/upload_pdf":
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"최대 {UPLOAD_MAX_BYTES // (1024 * 1024)}MB까지 업로드할 수 있습니다."},
+            )
+    return await call_next(request)
+
 # StaticFiles 설정
 base_dir = os.path.dirname(__file__)
 data_dir = os.path.join(base_dir, "data")
@@ -89,76 +147,44 @@ def ensure_dir(path: str):
         raise HTTPException(500, f"디렉터리 생성 실패: {e}")
 
 
-def scan_subdirs(dir_path):
-    """dir_path 아래의 하위 디렉터리 이름 목록 반환"""
-    if not os.path.isdir(dir_path):
-        return []
-    return [
-        name
-        for name in os.listdir(dir_path)
-        if os.path.isdir(os.path.join(dir_path, name))
-    ]
+def load_all_employees() -> Dict[Tuple[str, str, str], List[str]]:
+    """사번 DB에서 파트별 사번 목록 전체를 읽음 (처음 한 번은 employees.json을 이전)"""
+    store = get_employee_store()
+    store.migrate_from_json(data_dir)
+    return store.all_parts()
 
 
-def list_subdirs(path: str) -> List[str]:
-    if not os.path.isdir(path):
-        return []
-    return [
-        name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))
-    ]
+# 로그인 트리는 메모리에 한 번 만들어 두고 add_* 엔드포인트가 제자리에서 갱신
+org_tree = OrgTree(data_dir, load_all_employees)
+# 파트별 챗봇 목록도 bots.json + 메모리 캐시로 유지 (GET /chatbots)
+bot_registry = BotRegistry(data_dir)
 
 
-def load_employees(part_dir):
-    """part_dir/employees.json 파일이 있으면 리스트로 로드, 아니면 빈 리스트"""
-    emp_file = os.path.join(part_dir, "employees.json")
-    if not os.path.isfile(emp_file):
-        return []
-    try:
-        with open(emp_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, IOError):
-        return []
+@app.on_event("startup")
+def build_org_tree():
+    org_tree.build()
 
 
-def init_employees_file(part_dir: str):
-    emp_file = os.path.join(part_dir, "employees.json")
-    if not os.path.exists(emp_file):
-        with open(emp_file, "w", encoding="utf-8") as f:
-            json.dump([], f, ensure_ascii=False)
+@app.on_event("startup")
+def start_page_renderer():
+    # 첫 /chat 요청의 이벤트 루프에서 프로세스를 띄우지 않도록 미리 생성
+    start_render_pool()
 
 
 @app.get("/api/login", response_model=LoginOptions)
-def get_login_options():
-    companies: List[CompanyOption] = []
-
-    # data/ 아래에서 회사 디렉터리 반복
-    for comp_name in scan_subdirs(data_dir):
-        comp_dir = os.path.join(data_dir, comp_name)
-
-        teams: List[TeamOption] = []
-        for team_name in scan_subdirs(comp_dir):
-            team_dir = os.path.join(comp_dir, team_name)
-
-            parts: List[PartOption] = []
-            for part_name in scan_subdirs(team_dir):
-                part_dir = os.path.join(team_dir, part_name)
-                # employees.json 읽어서 리스트로
-                emp_list = load_employees(part_dir)
-                parts.append(PartOption(name=part_name, employees=emp_list))
-
-            teams.append(TeamOption(name=team_name, parts=parts))
-
-        companies.append(CompanyOption(name=comp_name, teams=teams))
-
-    return LoginOptions(companies=companies)
+def get_login_options(request: Request):
+    # 클라이언트가 가진 버전과 같으면 본문 없이 304
+    etag = org_tree.etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(org_tree.payload(), headers=headers)
 
 
 @app.post("/api/login")
-async def add_employee(info: CurrentLoginInfo):
+def add_employee(info: CurrentLoginInfo):
     """
-    company/team/part 경로 아래에 employees.json을 만들고,
-    중복 없이 employeeID를 추가합니다.
+    company/team/part 디렉터리를 만들고, 사번 DB에 중복 없이 employeeID를 추가합니다.
     """
     target_dir = os.path.join(data_dir, info.company, info.team, info.part)
     try:
@@ -166,34 +192,28 @@ async def add_employee(info: CurrentLoginInfo):
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"디렉터리 생성 실패: {e}")
 
-# 3) employees.json 읽고, 없으면 새로 만들고, 중복 없이 추가
-    emp_file = os.path.join(target_dir, "employees.json")
-    if os.path.isfile(emp_file):
-        try:
-            with open(emp_file, "r", encoding="utf-8") as f:
-                employees = json.load(f)
-        except (json.JSONDecodeError, IOError):
-            employees = []
-    else:
-        employees = []
-
-    if info.employeeID not in employees:
-        employees.append(info.employeeID)
-        try:
-            with open(emp_file, "w", encoding="utf-8") as f:
-                json.dump(employees, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            raise HTTPException(status_code=500, detail=f"employees.json 쓰기 실패: {e}")
+    # (company, team, part, employeeID) 유일 인덱스로 중복 검사 + 삽입
+    store = get_employee_store()
+    try:
+        store.add(info.company, info.team, info.part, info.employeeID)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"사번 저장 실패: {e}")
+    org_tree.add_employee(info.company, info.team, info.part, info.employeeID)
+
+    return {
+        "status": "ok",
+        "employees": store.list_part(info.company, info.team, info.part),
+    }
 
-    return {"status": "ok", "employees": employees}
 
 @app.post("/api/company")
 def add_company(info: CompanyCreate):
     global data_dir
     comp_dir = os.path.join(data_dir, info.company)
     ensure_dir(comp_dir)
+    org_tree.add_company(info.company)
     # 성공 시 회사 목록 반환
-    return {"status": "ok", "companies": list_subdirs(data_dir)}
+    return {"status": "ok", "companies": org_tree.companies()}
 
 
 @app.post("/api/team")
@@ -204,7 +224,8 @@ def add_team(info: TeamCreate):
         raise HTTPException(404, f"회사 '{info.company}'를 찾을 수 없습니다.")
     team_dir = os.path.join(comp_dir, info.team)
     ensure_dir(team_dir)
-    return {"status": "ok", "teams": list_subdirs(comp_dir)}
+    org_tree.add_team(info.company, info.team)
+    return {"status": "ok", "teams": org_tree.teams(info.company)}
 
 
 @app.post("/api/part")
@@ -217,8 +238,8 @@ def add_part(info: PartCreate):
         )
     part_dir = os.path.join(team_dir, info.part)
     ensure_dir(part_dir)
-    init_employees_file(part_dir)
-    return {"status": "ok", "parts": list_subdirs(team_dir)}
+    org_tree.add_part(info.company, info.team, info.part)
+    return {"status": "ok", "parts": org_tree.parts(info.company, info.team)}
 
 
 # QnA 스키마
@@ -231,8 +252,30 @@ class QuestionModel(BaseModel):
 
 class QnAResponse(BaseModel):
     questions: List[QuestionModel]
+    total: Optional[int] = None
 
-    # backend/api.py
+
+def qna_folder_of(company: str, team: str, part: str, chatbot_name: str) -> str:
+    return os.path.join(data_dir, company, team, part, chatbot_name, "qna")
+
+
+def qna_page(store, offset: int, limit: Optional[int]) -> QnAResponse:
+    try:
+        items, total = store.page(offset, limit)
+    except Exception:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="QnA 파일 로드 실패")
+    return QnAResponse(questions=[QuestionModel(**item) for item in items], total=total)
+
+
+def qna_existing_questions(store) -> List[str]:
+    """추가 생성 시 중복 제외용 기존 문항 텍스트 (로드 실패는 qna_page와 같이 500)"""
+    try:
+        items, _ = store.page()
+    except Exception:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="QnA 파일 로드 실패")
+    return [item["question"] for item in items]
 
 
 # QnA 삭제(단일 문항) 엔드포인트
@@ -243,37 +286,40 @@ def delete_qna_question(
     part: str = Query(...),
     chatbot_name: str = Query(...),
     question_id: int = Query(..., description="삭제할 문항 ID"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="반환할 문항 수 (없으면 전체)"),
 ):
     """
-    qna.json에서 지정된 id의 질문을 삭제하고, 결과를 반환합니다.
+    지정된 id의 질문을 삭제하고, 결과를 반환합니다.
+    삭제는 qna.log에 한 줄만 덧붙입니다.
     """
-    base = os.path.join(data_dir, company, team, part, chatbot_name)
-    file_path = os.path.join(base, "qna", "qna.json")
-    if not os.path.exists(file_path):
+    store = get_qna_store(qna_folder_of(company, team, part, chatbot_name))
+    if not store.exists():
         raise HTTPException(status_code=404, detail="QnA 파일이 존재하지 않습니다.")
 
-    # 로드
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        store.delete(question_id)
     except Exception:
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail="QnA 파일 로드 실패")
+        raise HTTPException(status_code=500, detail="QnA 파일 저장 실패")
 
-    # 필터링
-    new_data = [item for item in data if item.get("id") != question_id]
+    return qna_page(store, offset, limit)
 
-    # 저장
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(new_data, f, ensure_ascii=False, indent=2)
-    except Exception:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="QnA 파일 저장 실패")
 
-    # Pydantic 모델로 래핑
-    questions = [QuestionModel(**item) for item in new_data]
-    return QnAResponse(questions=questions)
+# QnA 조회(페이지 단위) 엔드포인트
+@app.get("/api/qna", response_model=QnAResponse)
+def list_qna(
+    company: str = Query(...),
+    team: str = Query(...),
+    part: str = Query(...),
+    chatbot_name: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(50, ge=1),
+):
+    store = get_qna_store(qna_folder_of(company, team, part, chatbot_name))
+    if not store.exists():
+        raise HTTPException(status_code=404, detail="QnA 파일이 존재하지 않습니다.")
+    return qna_page(store, offset, limit)
 
 
 # QnA 생성/로드 엔드포인트
@@ -285,10 +331,12 @@ def create_or_load_qna(
     chatbot_name: str = Query(...),
     force: bool = Query(False, description="강제 재생성 여부"),
     n_questions: int = Query(5, description="생성할 문제 개수"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="반환할 문항 수 (없으면 전체)"),
 ):
     """
     데이터 폴더 내 챗봇별 FAISS 인덱스를 바탕으로 객관식 문제를 생성하고 qna/qna.json에 저장하거나,
-    이미 존재하면 해당 파일을 불러옵니다.
+    이미 존재하면 해당 문항을 불러옵니다.
     """
     base = os.path.join(data_dir, company, team, part, chatbot_name)
     index_dir = os.path.join(base, "faiss_index")
@@ -297,36 +345,22 @@ def create_or_load_qna(
             status_code=404, detail="먼저 PDF를 업로드하고 인덱스를 생성하세요."
         )
 
-    qna_folder = os.path.join(base, "qna")
-    os.makedirs(qna_folder, exist_ok=True)
-    file_path = os.path.join(qna_folder, "qna.json")
+    store = get_qna_store(qna_folder_of(company, team, part, chatbot_name))
 
     # ── 디버깅 로그 ──
     print(f"[QnA] company={company}, team={team}, part={part}, bot={chatbot_name}")
-    print(f"[QnA] qna_folder: {qna_folder}")
-    print(f"[QnA] file_path: {file_path}")
-    print(f"[QnA] exists before generation: {os.path.exists(file_path)}")
+    print(f"[QnA] exists before generation: {store.exists()}")
 
-    if force or not os.path.exists(file_path):
-        # 새로 생성
+    if force or not store.exists():
+        # 새로 생성 (ID는 저장소가 1부터 부여)
         questions = generate_mc_questions(index_dir=index_dir, n_questions=n_questions)
-        # ID 부여
-        for idx, q in enumerate(questions, start=1):
-            q.id = idx
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump([q.dict() for q in questions], f, ensure_ascii=False, indent=2)
-    else:
-        # 기존 로드
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            questions = [QuestionModel(**item) for item in data]
+            store.replace_all(q.dict() for q in questions)
         except Exception:
             traceback.print_exc()
-            raise HTTPException(status_code=500, detail="QnA 파일 로드 실패")
-    # MCQItem을 QuestionModel로 변환
-    qm_list = [QuestionModel(**q.dict()) for q in questions]
-    return QnAResponse(questions=qm_list)
+            raise HTTPException(status_code=500, detail="QnA 파일 저장 실패")
+
+    return qna_page(store, offset, limit)
 
 
 # QnA 추가 엔드포인트
@@ -337,9 +371,12 @@ def append_qna(
     part: str = Query(...),
     chatbot_name: str = Query(...),
     n_questions: int = Query(5, description="추가 생성할 문제 개수"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="반환할 문항 수 (없으면 전체)"),
 ):
     """
-    기존 qna.json에 추가 문제를 생성해 이어붙이고 전체 반환합니다.
+    추가 문제를 생성해 기존 문항 뒤에 이어붙이고 반환합니다.
+    새 문항만 qna.log에 덧붙이며 기존 문항은 다시 쓰지 않습니다.
     """
     base = os.path.join(data_dir, company, team, part, chatbot_name)
     index_dir = os.path.join(base, "faiss_index")
@@ -348,82 +385,98 @@ def append_qna(
             status_code=404, detail="먼저 PDF를 업로드하고 인덱스를 생성하세요."
         )
 
-    qna_folder = os.path.join(base, "qna")
-    file_path = os.path.join(qna_folder, "qna.json")
-    if not os.path.exists(file_path):
+    store = get_qna_store(qna_folder_of(company, team, part, chatbot_name))
+    if not store.exists():
         raise HTTPException(status_code=404, detail="먼저 /api/qna로 생성해주세요.")
 
+    # 기존 문항과 임베딩 유사도가 높은 문항은 걸러냄
+    existing = qna_existing_questions(store)
+    new_qs = generate_mc_questions(index_dir=index_dir, n_questions=n_questions, existing=existing)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            existing = json.load(f)
+        # ID는 저장소 잠금 안에서 부여되므로 동시 추가 요청끼리 겹치지 않음
+        store.append(q.dict() for q in new_qs)
     except Exception:
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail="기존 QnA 파일 로드 실패")
+        raise HTTPException(status_code=500, detail="QnA 파일 저장 실패")
 
-    new_qs = generate_mc_questions(index_dir=index_dir, n_questions=n_questions)
-    base_id = max((item.get("id", 0) for item in existing), default=0)
-    for i, q in enumerate(new_qs, start=1):
-        q.id = base_id + i
-        existing.append(q.dict())
+    return qna_page(store, offset, limit)
 
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(existing, f, ensure_ascii=False, indent=2)
-    except Exception:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="QnA 파일 저장 실패")
 
-    return QnAResponse(questions=[QuestionModel(**item) for item in existing])
+# QnA 추가(스트리밍) 엔드포인트
+@app.post("/api/qna/append/stream")
+def append_qna_stream(
+    company: str = Query(...),
+    team: str = Query(...),
+    part: str = Query(...),
+    chatbot_name: str = Query(...),
+    n_questions: int = Query(5, description="추가 생성할 문제 개수"),
+):
+    """
+    /api/qna/append와 같지만 배치가 끝날 때마다 저장하고 SSE로 내보냅니다.
+    이벤트: questions({questions: [...]}) → done({added, total}) / error({detail})
+    """
+    base = os.path.join(data_dir, company, team, part, chatbot_name)
+    index_dir = os.path.join(base, "faiss_index")
+    if not os.path.isdir(index_dir):
+        raise HTTPException(
+            status_code=404, detail="먼저 PDF를 업로드하고 인덱스를 생성하세요."
+        )
+    store = get_qna_store(qna_folder_of(company, team, part, chatbot_name))
+    if not store.exists():
+        raise HTTPException(status_code=404, detail="먼저 /api/qna로 생성해주세요.")
+    existing = qna_existing_questions(store)
+
+    def events():
+        added = 0
+        try:
+            for batch in iter_mc_questions(index_dir, n_questions, existing):
+                saved = store.append(q.dict() for q in batch)
+                added += len(saved)
+                yield sse_event("questions", {"questions": saved})
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"detail": f"MCQ 생성 실패: {e}"})
+        yield sse_event("done", {"added": added, "total": store.count()})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # (2) 학습된 챗봇 목록 조회 엔드포인트
 @app.get("/chatbots", response_model=List[Dict[str, Any]])
-async def list_chatbots(company: str, team: str, part: str):
-    target_dir = os.path.join(data_dir, company, team, part)
-    if not os.path.isdir(target_dir):
+def list_chatbots(
+    company: str,
+    team: str,
+    part: str,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="반환할 챗봇 수 (없으면 전체)"),
+    refresh: bool = Query(False, description="bots.json을 다시 만들지 여부"),
+):
+    """
+    파트별 챗봇 목록을 메모리의 bots.json 캐시에서 최근 생성 순으로 반환합니다.
+    전체 개수는 X-Total-Count 헤더로 알려줍니다.
+    """
+    if not os.path.isdir(os.path.join(data_dir, company, team, part)):
         return []
-    chatbots: List[Dict[str, Any]] = []
-    for name in os.listdir(target_dir):
-        bot_dir = os.path.join(target_dir, name)
-        faiss_dir = os.path.join(bot_dir, "faiss_index")
-        if not os.path.isdir(faiss_dir):
-            continue
-        pdf_url = None
-        pdf_folder = os.path.join(bot_dir, "pdf")
-        if os.path.isdir(pdf_folder):
-            for fname in os.listdir(pdf_folder):
-                if fname.lower().endswith(".pdf"):
-                    rel = os.path.relpath(
-                        os.path.join(pdf_folder, fname), data_dir
-                    ).replace("\\", "/")
-                    pdf_url = f"/static/{rel}"
-                    break
-        try:
-            c = os.path.getctime(faiss_dir)
-            m = os.path.getmtime(faiss_dir)
-        except OSError:
-            c = m = time.time()
-        chatbots.append(
-            {
-                "name": name,
-                "company": company,
-                "team": team,
-                "part": part,
-                "indexPath": faiss_dir,
-                "createdAt": int(c * 1000),
-                "lastTrainedAt": int(m * 1000),
-                "pdf_url": pdf_url,
-            }
-        )
-    chatbots.sort(key=lambda x: x["createdAt"], reverse=True)
-    return chatbots
+    if refresh:
+        bot_registry.refresh(company, team, part)
+    chatbots = bot_registry.list(company, team, part)
+    response.headers["X-Total-Count"] = str(len(chatbots))
+    end = None if limit is None else offset + limit
+    return chatbots[offset:end]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # (3) 챗봇 삭제 엔드포인트
 @app.delete("/chatbots")
-async def delete_chatbot(
+def delete_chatbot(
     company: str = Query(...),
     team: str = Query(...),
     part: str = Query(...),
@@ -434,6 +487,10 @@ async def delete_chatbot(
         raise HTTPException(status_code=404, detail="챗봇을 찾을 수 없습니다.")
     try:
         shutil.rmtree(chatbot_dir)
+        invalidate_vector_store(chatbot_dir)
+        invalidate_answers(chatbot_dir)
+        drop_qna_stores(chatbot_dir)
+        bot_registry.remove(company, team, part, chatbot_name)
         return {"success": True}
     except Exception:
         traceback.print_exc()
@@ -449,27 +506,178 @@ async def upload_pdf(
     team: str = Form(...),
     part: str = Form(...),
     chatbot_name: str = Form(...),
+    index_type: Optional[str] = Form(None),
 ):
+    if index_type is not None and index_type not in INDEX_TYPES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 인덱스 종류: {index_type}")
     chatbot_base = os.path.join(data_dir, company, team, part, chatbot_name)
     pdf_folder = os.path.join(chatbot_base, "pdf")
     faiss_folder = os.path.join(chatbot_base, "faiss_index")
     os.makedirs(pdf_folder, exist_ok=True)
     os.makedirs(faiss_folder, exist_ok=True)
-    path = os.path.join(pdf_folder, file.filename)
-    contents = await file.read()
-    with open(path, "wb") as f:
-        f.write(contents)
+    org_tree.add_part(company, team, part)
     try:
-        docs = pdf_to_documents(path)
-    except Exception:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="PDF 파싱 실패")
+        filename = safe_filename(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    path = os.path.join(pdf_folder, filename)
+
+    # 전체를 메모리에 올리지 않고 고정 크기 청크로 복사하면서 해시 계산 (스레드풀에서)
     try:
-        build_vector_store(docs, index_dir=faiss_folder)
-    except Exception:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="벡터 인덱스 생성 실패")
-    return {"message": "완료", "pdf_url": path, "faiss_index_dir": faiss_folder}
+        saved = await run_in_threadpool(stream_to_file, file.file, path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # 같은 내용의 PDF가 이미 학습되어 있으면 (이름이 달라도) 저장/재학습 생략
+    duplicate = find_source_by_hash(faiss_folder, saved["sha256"])
+    if duplicate is not None and os.path.isfile(os.path.join(pdf_folder, duplicate)):
+        discard_upload(saved["tmp_path"])
+        return {
+            "message": "이미 학습된 PDF",
+            "duplicate": True,
+            "job_id": None,
+            "pdf_url": os.path.join(pdf_folder, duplicate),
+            "faiss_index_dir": faiss_folder,
+        }
+    commit_upload(saved["tmp_path"], path)
+
+    # 챗봇 목록(bots.json)에는 학습이 끝난 뒤에 등록 (ingest_pdf의 register_trained_bot)
+    try:
+        job = get_job_manager().submit(
+            "ingest_pdf",
+            ingest_pdf,
+            path,
+            faiss_folder,
+            index_type,
+            saved["sha256"],
+            meta={
+                "company": company,
+                "team": team,
+                "part": part,
+                "chatbot_name": chatbot_name,
+                "filename": filename,
+                "size": saved["size"],
+            },
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=503, detail="학습 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요."
+        )
+    return {
+        "message": "접수",
+        "job_id": job.id,
+        "pdf_url": path,
+        "faiss_index_dir": faiss_folder,
+    }
+
+
+def register_trained_bot(job: Job, path: str, **fields: Any) -> None:
+    """학습이 끝난(또는 이미 학습된) PDF의 챗봇을 목록에 등록/갱신"""
+    meta = job.meta
+    if meta.get("chatbot_name"):
+        bot_registry.upsert(
+            meta["company"],
+            meta["team"],
+            meta["part"],
+            meta["chatbot_name"],
+            pdf_url=bot_registry.static_url(path),
+            **fields,
+        )
+
+
+def ingest_pdf(
+    job: Job,
+    path: str,
+    faiss_folder: str,
+    index_type: Optional[str] = None,
+    content_hash: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    작업 워커에서 실행되는 PDF 파싱 + 인덱싱.
+    진행률: pages_parsed / chunks_embedded (파싱과 임베딩이 스트림으로 함께 진행) → index_written
+    같은 이름·같은 내용의 PDF가 이미 인덱스에 있으면 파싱/임베딩을 건너뜁니다.
+    """
+    source = os.path.basename(path)
+    # 업로드 중 계산한 해시가 있으면 파일을 다시 읽지 않음
+    content_hash = content_hash or file_sha256(path)
+    # 같은 챗봇에 동시에 올라온 PDF는 한 번에 하나씩 인덱스에 반영 (마지막 저장이 앞의 결과를 덮지 않도록)
+    with index_lock(faiss_folder):
+        if is_indexed(faiss_folder, source, content_hash):
+            register_trained_bot(job, path)
+            job.update("index_written", 1, 1)
+            return {"pdf_url": path, "faiss_index_dir": faiss_folder, "skipped": True}
+
+        def parsed_chunks():
+            # 파싱 실패를 임베딩 실패와 구분해 보고
+            try:
+                yield from iter_pdf_documents(
+                    path, progress=lambda done, total: job.update("pages_parsed", done, total)
+                )
+            except JobCancelled:
+                raise
+            except Exception as e:
+                raise PdfParseError("PDF 파싱 실패") from e
+
+        # 이 챗봇의 다른 PDF에 이미 저장된 청크(이전 개정판 등)는 다시 임베딩하지 않음
+        deduper = ChunkDeduper(
+            existing=indexed_chunk_hashes(load_manifest(faiss_folder), exclude=source)
+        )
+        # 파싱 → 중복 제거 → 배치 임베딩을 스트림으로 연결 (PDF 전체를 메모리에 모으지 않음)
+        job.update("chunks_embedded", 0)
+        try:
+            stats = build_vector_store(
+                deduper.filter(parsed_chunks()),
+                index_dir=faiss_folder,
+                progress=lambda done: job.update("chunks_embedded", done),
+                source=source,
+                content_hash=content_hash,
+                index_type=index_type,
+                shared_hashes=deduper.shared_hashes,
+            )
+        except (JobCancelled, PdfParseError):
+            raise
+        except Exception as e:
+            raise RuntimeError("벡터 인덱스 생성 실패") from e
+        dedup_stats = deduper.stats
+        # 어휘(BM25) 인덱스를 faiss_index/ 옆에 함께 생성
+        lexical_stats = build_lexical_index(faiss_folder, get_vector_store(faiss_folder))
+        # 재학습된 챗봇의 이전 답변은 더 이상 유효하지 않음
+        invalidate_answers(faiss_folder)
+        register_trained_bot(
+            job,
+            path,
+            lastTrainedAt=int(time.time() * 1000),
+            stats={
+                "vectors": stats["total"],
+                "sources": len(load_manifest(faiss_folder)["sources"]),
+                "index_type": stats["index_type"],
+            },
+        )
+        job.update("index_written", 1, 1)
+    return {
+        "pdf_url": path,
+        "faiss_index_dir": faiss_folder,
+        "dedup": dedup_stats,
+        "embedding": stats,
+        "lexical": lexical_stats,
+    }
+
+
+# 작업 상태 조회 / 취소
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -481,11 +689,26 @@ class ChatRequest(BaseModel):
     chatbot_name: str
     question: str
     chat_history: List[Dict[str, str]] = []
+    # 같은 대화의 요청을 묶는 ID (있으면 오래된 대화를 세션별로 요약해 재사용)
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
+    # {"prompt_tokens", "completion_tokens", "context_tokens"}
+    usage: Optional[Dict[str, int]] = None
+
+
+# 동시에 처리할 /chat, /chat/stream 요청 수와 요청당 제한 시간 (대기 시간 포함)
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+CHAT_TIMEOUT_SECONDS = float(os.getenv("CHAT_TIMEOUT_SECONDS", "60"))
+_chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
+
+async def _limited(fn, *args, **kwargs):
+    async with _chat_slots:
+        return await fn(*args, **kwargs)
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -502,9 +725,259 @@ async def chat(request: ChatRequest):
     )
     if not os.path.isdir(faiss_folder):
         raise HTTPException(status_code=404, detail="FAISS 인덱스 없음")
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(
+            _limited(
+                aprocess_question,
+                user_question=question,
+                index_dir=faiss_folder,
+                chat_history=request.chat_history,
+                session_id=request.session_id,
+            ),
+            timeout=CHAT_TIMEOUT_SECONDS,
+        )
+        sources = with_page_images(result["sources"], company, team, part, chatbot_name)
+        schedule_thumbnails(sources, company, team, part, chatbot_name)
+        return ChatResponse(answer=result["answer"], sources=sources, usage=result.get("usage"))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="응답 시간 초과")
+    except Exception:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="서버 오류")
+    finally:
+        get_recorder("chat").record(time.perf_counter() - started)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Server-Sent Events 한 건을 직렬화"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    /chat의 SSE 버전: 검색된 sources를 먼저 보내고, 이어서 답변 토큰을 흘려보냅니다.
+    이벤트: sources → token(여러 번) → done (또는 error)
+    """
+    company = request.company.strip()
+    team = request.team.strip()
+    part = request.part.strip()
+    chatbot_name = request.chatbot_name.strip()
+    question = request.question.strip()
+    if not all([company, team, part, chatbot_name, question]):
+        raise HTTPException(status_code=400, detail="파라미터 누락")
+    faiss_folder = os.path.join(
+        data_dir, company, team, part, chatbot_name, "faiss_index"
+    )
+    if not os.path.isdir(faiss_folder):
+        raise HTTPException(status_code=404, detail="FAISS 인덱스 없음")
+
+    async def events():
+        # /chat과 같은 동시 처리 한도와 제한 시간(슬롯 대기 포함)을 적용
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CHAT_TIMEOUT_SECONDS
+        try:
+            await asyncio.wait_for(_chat_slots.acquire(), timeout=CHAT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            yield sse_event("error", {"detail": "응답 시간 초과"})
+            return
+        items = stream_question(
+            user_question=question,
+            index_dir=faiss_folder,
+            chat_history=request.chat_history,
+            session_id=request.session_id,
+        )
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # 동기 제너레이터의 다음 이벤트를 스레드에서 받아 옴 (시간 초과 시 기다리지 않고 중단)
+                item = await asyncio.wait_for(
+                    loop.run_in_executor(None, next, items, None), timeout=remaining
+                )
+                if item is None:
+                    break
+                if item["event"] == "sources":
+                    item["data"] = with_page_images(item["data"], company, team, part, chatbot_name)
+                    schedule_thumbnails(item["data"], company, team, part, chatbot_name)
+                if item["event"] == "done":
+                    ttft_ms = item["data"]["ttft_ms"]
+                    if ttft_ms is not None:
+                        get_recorder("chat_stream_ttft").record(ttft_ms / 1000)
+                    get_recorder("chat_stream").record(item["data"]["total_ms"] / 1000)
+                yield sse_event(item["event"], item["data"])
+        except asyncio.TimeoutError:
+            yield sse_event("error", {"detail": "응답 시간 초과"})
+        except Exception:
+            traceback.print_exc()
+            yield sse_event("error", {"detail": "서버 오류"})
+        finally:
+            _chat_slots.release()
+            try:
+                items.close()
+            except ValueError:
+                # 시간 초과로 버린 next()가 아직 스레드에서 실행 중이면 그쪽이 끝나며 정리됨
+                pass
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# (6) 여러 챗봇 통합 검색 엔드포인트 (회사/팀/파트 범위)
+class SearchRequest(BaseModel):
+    company: str
+    team: Optional[str] = None
+    part: Optional[str] = None
+    question: str
+    top_k: int = Field(5, ge=1, le=50)
+
+
+class SearchResponse(BaseModel):
+    searched: int
+    failed: List[str]
+    sources: List[Dict[str, Any]]
+
+
+@app.post("/search", response_model=SearchResponse)
+def search_all(request: SearchRequest):
+    """
+    지정한 회사(또는 팀/파트) 아래 모든 챗봇 인덱스에 같은 질문을 병렬로 검색하고,
+    점수순으로 합친 상위 top_k개 출처를 챗봇 이름과 함께 반환합니다.
+    """
+    scope = [request.company.strip()]
+    if request.team:
+        scope.append(request.team.strip())
+        if request.part:
+            scope.append(request.part.strip())
+    elif request.part:
+        raise HTTPException(status_code=400, detail="part를 지정하려면 team도 필요합니다.")
+    question = request.question.strip()
+    if not all(scope) or not question:
+        raise HTTPException(status_code=400, detail="파라미터 누락")
+    if not os.path.isdir(os.path.join(data_dir, *scope)):
+        raise HTTPException(status_code=404, detail="검색 범위를 찾을 수 없습니다.")
     try:
-        result = process_question(user_question=question, index_dir=faiss_folder)
-        return ChatResponse(answer=result["answer"], sources=result["sources"])
+        result = federated_search(data_dir, scope, question, top_k=request.top_k)
     except Exception:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="서버 오류")
+    result["sources"] = [
+        with_page_images([hit], hit["company"], hit["team"], hit["part"], hit["chatbot_name"])[0]
+        for hit in result["sources"]
+    ]
+    for hit in result["sources"]:
+        prefetch_thumbnails([hit], hit["company"], hit["team"], hit["part"], hit["chatbot_name"])
+    return SearchResponse(**result)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# (7) 캐시/지연시간 통계 엔드포인트
+@app.get("/stats")
+def get_stats():
+    return {
+        "latency": latency_snapshot(),
+        "vector_store_cache": store_cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "answer_cache": answer_cache_stats(),
+        "tokens": token_usage_snapshot(),
+        "sessions": session_cache_stats(),
+        "page_images": page_image_stats(),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# (8) 출처 페이지 이미지 (요청 시 렌더링 + 디스크 LRU 캐시)
+def page_pdf_path(company: str, team: str, part: str, chatbot_name: str, pdf_name: str) -> str:
+    return os.path.join(
+        data_dir, company, team, part, chatbot_name, "pdf", safe_filename(pdf_name)
+    )
+
+
+def with_page_images(
+    sources: List[Dict[str, Any]], company: str, team: str, part: str, chatbot_name: str
+) -> List[Dict[str, Any]]:
+    """
+    출처마다 image_path(full)/thumb_path(thumb) URL을 채운 사본을 반환합니다 (파일 I/O 없음).
+    이미지는 URL이 요청될 때 렌더링합니다. 썸네일 미리 렌더링은 prefetch_thumbnails.
+    (답변 캐시에 저장된 sources를 바꾸지 않도록 사본을 만듦)
+    """
+    result: List[Dict[str, Any]] = []
+    for src in sources:
+        src = dict(src)
+        if src.get("page") is not None and src.get("pdf_name"):
+            query = urlencode(
+                {
+                    "company": company,
+                    "team": team,
+                    "part": part,
+                    "chatbot_name": chatbot_name,
+                    "pdf_name": src["pdf_name"],
+                    "page": src["page"],
+                }
+            )
+            src["image_path"] = f"/page_image?{query}&variant=full"
+            src["thumb_path"] = f"/page_image?{query}&variant=thumb"
+        result.append(src)
+    return result
+
+
+def prefetch_thumbnails(
+    sources: List[Dict[str, Any]], company: str, team: str, part: str, chatbot_name: str
+) -> None:
+    """출처 썸네일의 렌더링만 예약 (파일 확인/캐시 조회가 있으므로 이벤트 루프 밖에서 호출)"""
+    for src in sources:
+        if src.get("page") is None or not src.get("pdf_name"):
+            continue
+        try:
+            pdf_path = page_pdf_path(company, team, part, chatbot_name, src["pdf_name"])
+            if os.path.isfile(pdf_path):
+                get_page_image_cache().prefetch(pdf_path, src["page"], VARIANT_DPI["thumb"])
+        except Exception:
+            # 미리 렌더링은 최선 노력: 실패해도 URL 요청 시 다시 렌더링
+            traceback.print_exc()
+
+
+def schedule_thumbnails(
+    sources: List[Dict[str, Any]], company: str, team: str, part: str, chatbot_name: str
+) -> None:
+    """async 핸들러용: 썸네일 예약을 스레드풀에 넘기고 기다리지 않음"""
+    asyncio.get_running_loop().run_in_executor(
+        None, prefetch_thumbnails, sources, company, team, part, chatbot_name
+    )
+
+
+@app.get("/page_image")
+def page_image(
+    company: str = Query(...),
+    team: str = Query(...),
+    part: str = Query(...),
+    chatbot_name: str = Query(...),
+    pdf_name: str = Query(...),
+    page: int = Query(..., ge=0, description="0부터 시작하는 페이지 번호 (sources의 page)"),
+    variant: str = Query("full", description="thumb | full"),
+    dpi: Optional[int] = Query(None, description="직접 지정할 해상도 (variant보다 우선)"),
+):
+    try:
+        pdf_path = page_pdf_path(company, team, part, chatbot_name, pdf_name)
+        resolved_dpi = resolve_dpi(variant, dpi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isfile(pdf_path):
+        raise HTTPException(status_code=404, detail="PDF를 찾을 수 없습니다.")
+    try:
+        path = get_page_image_cache().get(pdf_path, page, resolved_dpi)
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="페이지 렌더링 실패")
+    # 서버 캐시 키에는 PDF 수정 시각이 들어가 재업로드 시 새로 렌더링됨 (브라우저 캐시는 1시간)
+    return FileResponse(
+        path, media_type="image/png", headers={"Cache-Control": "public, max-age=3600"}
+    )
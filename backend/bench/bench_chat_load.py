@@ -0,0 +1,77 @@
+# backend/bench/bench_chat_load.py
+"""
+/chat 부하 테스트: 동시 클라이언트 수를 늘려가며 초당 처리량과 p50/p99를 측정합니다.
+
+    # 서버 (네트워크 없이 LLM/임베딩 지연만 흉내)
+    cd backend
+    EMBEDDING_BACKEND=fake LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=500 \
+        uvicorn api:app --port 8088
+    # 부하
+    python -m bench.bench_chat_load --company C --team T --part P --bot B
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+
+async def run_level(client: httpx.AsyncClient, url: str, body: dict, clients: int, requests: int):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = dict(body, question=f"{body['question']} #{i}")
+            started = time.perf_counter()
+            resp = await client.post(url, json=payload)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(
+        f"clients={clients:3d} rps={requests / elapsed:7.2f} "
+        f"p50={p50:7.1f}ms p99={p99:7.1f}ms errors={errors}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8088/chat")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--team", required=True)
+    parser.add_argument("--part", required=True)
+    parser.add_argument("--bot", required=True)
+    parser.add_argument("--question", default="Hi5a 조작메뉴에서 원점 설정은 어떻게 하나요?")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    args = parser.parse_args()
+
+    body = {
+        "company": args.company,
+        "team": args.team,
+        "part": args.part,
+        "chatbot_name": args.bot,
+        "question": args.question,
+    }
+    async with httpx.AsyncClient(timeout=120) as client:
+        for clients in args.clients:
+            await run_level(client, args.url, body, clients, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
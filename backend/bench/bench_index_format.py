@@ -0,0 +1,131 @@
+# backend/bench/bench_index_format.py
+"""
+같은 합성 인덱스를 pickle(index.pkl)과 compact(mmap 벡터 + docstore.sqlite) 형식으로 저장하고,
+형식마다 새 프로세스에서 로드 시간 / 첫 질의 시간 / 상주 메모리(RSS) 증가량을 비교합니다.
+
+    cd backend
+    python -m bench.bench_index_format --chunks 100000 --dim 1536
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+
+import numpy as np  # noqa: E402
+import faiss  # noqa: E402
+from langchain_community.docstore.in_memory import InMemoryDocstore  # noqa: E402
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from langchain_core.documents.base import Document  # noqa: E402
+
+from utils.compact_store import save_vector_store  # noqa: E402
+from utils.embedding import get_embeddings, load_vector_store  # noqa: E402
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def synthetic_store(n: int, dim: int, seed: int = 0) -> FAISS:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    ids = [f"synthetic.pdf:{i}" for i in range(n)]
+    docs = {
+        doc_id: Document(
+            id=doc_id,
+            page_content=f"합성 청크 {i} — Hi5a 조작 메뉴 설정 항목 {i % 97}, 오류코드 E{i:05d} " * 8,
+            metadata={"page": i // 10, "pdf_name": "synthetic.pdf", "chunk_id": doc_id},
+        )
+        for i, doc_id in enumerate(ids)
+    }
+    return FAISS(
+        embedding_function=get_embeddings(),
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+
+def measure(index_dir: str, dim: int, queries: int, k: int) -> dict:
+    """자식 프로세스에서 실행: 로드 → 첫 질의 → 반복 질의"""
+    base = rss_mb()
+    t0 = time.perf_counter()
+    store = load_vector_store(index_dir)
+    load_s = time.perf_counter() - t0
+    after_load = rss_mb()
+
+    rng = np.random.default_rng(1)
+    qs = rng.standard_normal((queries, dim)).astype("float32")
+    t0 = time.perf_counter()
+    store.similarity_search_by_vector(qs[0].tolist(), k=k)
+    first_s = time.perf_counter() - t0
+    latencies = []
+    for q in qs[1:]:
+        t0 = time.perf_counter()
+        store.similarity_search_by_vector(q.tolist(), k=k)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return {
+        "load_s": load_s,
+        "first_query_s": first_s,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "rss_load_mb": after_load - base,
+        "rss_query_mb": rss_mb() - base,
+    }
+
+
+def dir_size_mb(path: str) -> float:
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file()) / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.dim, args.queries, args.k)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_index_format_")
+    try:
+        store = synthetic_store(args.chunks, args.dim)
+        for fmt in ("pickle", "compact"):
+            index_dir = os.path.join(workdir, fmt)
+            t0 = time.perf_counter()
+            save_vector_store(store, index_dir, fmt)
+            save_s = time.perf_counter() - t0
+            # 부모 프로세스의 페이지 캐시/할당 상태가 섞이지 않도록 형식마다 새 프로세스에서 측정
+            out = subprocess.run(
+                [sys.executable, "-m", "bench.bench_index_format", "--child", index_dir,
+                 "--dim", str(args.dim), "--queries", str(args.queries), "--k", str(args.k)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{fmt:8s} size={dir_size_mb(index_dir):7.1f}MB save={save_s:6.2f}s "
+                f"load={r['load_s'] * 1000:8.1f}ms first_query={r['first_query_s'] * 1000:7.1f}ms "
+                f"p50={r['p50_ms']:6.2f}ms rss(load)={r['rss_load_mb']:7.1f}MB "
+                f"rss(query)={r['rss_query_mb']:7.1f}MB"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# backend/bench/bench_ingest.py
+"""
+가짜 임베딩 백엔드로 build_vector_store 처리량(청크/초)을 측정합니다.
+
+    cd backend
+    EMBEDDING_BACKEND=fake FAKE_EMBED_LATENCY_MS=200 python -m bench.bench_ingest --chunks 2000
+"""
+import os
+import argparse
+import tempfile
+
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("EMBED_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "embeddings.sqlite"))
+
+from langchain_core.documents.base import Document  # noqa: E402
+
+from utils.embedding import build_vector_store  # noqa: E402
+
+
+def synthetic_documents(n: int):
+    for i in range(n):
+        yield Document(
+            page_content=f"합성 청크 {i} — Hi5a 조작 메뉴 설정 항목 {i % 97}, 오류코드 E{i:05d}",
+            metadata={"page": i // 10, "pdf_name": "synthetic.pdf"},
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    for batch_size in args.batch_size:
+        for concurrency in args.concurrency:
+            index_dir = tempfile.mkdtemp()
+            stats = build_vector_store(
+                synthetic_documents(args.chunks),
+                index_dir=index_dir,
+                batch_size=batch_size,
+                concurrency=concurrency,
+            )
+            print(
+                f"batch={batch_size:4d} concurrency={concurrency:2d} "
+                f"-> {stats['chunks_per_sec']} chunks/s ({stats['seconds']}s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
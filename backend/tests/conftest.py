@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# 서버와 같이 backend/를 기준으로 `from utils.x import ...`가 되도록
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
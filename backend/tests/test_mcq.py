@@ -0,0 +1,104 @@
+# backend/tests/test_mcq.py
+import json
+
+import pytest
+
+from utils import mcq
+from utils.mcq import MCQItem, MCQStreamParser, extract_mcq_objects, validate_mcq
+
+
+def _obj(i: int, answer=1) -> dict:
+    return {"question": f"질문 {i}?", "choices": ["A", "B", "C", "D"], "answerIndex": answer}
+
+
+def _feed_in_pieces(text: str, size: int = 7) -> list:
+    parser = MCQStreamParser()
+    found = []
+    for start in range(0, len(text), size):
+        found.extend(parser.feed(text[start:start + size]))
+    return found
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MCQStreamParser
+# ─────────────────────────────────────────────────────────────────────────────
+def test_truncated_output_keeps_complete_objects():
+    text = json.dumps([_obj(1), _obj(2)], ensure_ascii=False)
+    truncated = text[:-1] + ', {"question": "잘린 질문?", "choices": ["A", "B"'
+    assert [o["question"] for o in _feed_in_pieces(truncated)] == ["질문 1?", "질문 2?"]
+
+
+def test_code_fence_and_prose_are_ignored():
+    body = json.dumps([_obj(1), _obj(2)], ensure_ascii=False, indent=2)
+    text = f"다음은 문제입니다.\n```json\n{body}\n```\n설명 끝."
+    assert [o["question"] for o in _feed_in_pieces(text)] == ["질문 1?", "질문 2?"]
+
+
+def test_trailing_commas_are_tolerated():
+    text = '[{"question": "질문?", "choices": ["A", "B", "C", "D",], "answerIndex": 0,},]'
+    objs = extract_mcq_objects(text)
+    assert len(objs) == 1
+    assert objs[0]["choices"] == ["A", "B", "C", "D"]
+
+
+def test_braces_inside_strings_and_wrapped_list():
+    item = {"question": "값 {x}와 \"}\" 중 맞는 것은?", "choices": ["{", "}", "C", "D"], "answerIndex": 3}
+    text = json.dumps({"questions": [item, _obj(2)]}, ensure_ascii=False)
+    objs = _feed_in_pieces(text, size=3)
+    assert [o["question"] for o in objs] == [item["question"], "질문 2?"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# validate_mcq
+# ─────────────────────────────────────────────────────────────────────────────
+def test_valid_item():
+    item = validate_mcq({"question": " 질문? ", "choices": ["A", "B", "C", "D"], "answerIndex": 0})
+    assert item == MCQItem(question="질문?", choices=["A", "B", "C", "D"], answerIndex=0)
+
+
+@pytest.mark.parametrize("answer", ["2", 2.0, True, None])
+def test_non_int_answer_index_is_rejected(answer):
+    assert validate_mcq(_obj(1, answer=answer)) is None
+
+
+@pytest.mark.parametrize("answer", [-1, 4])
+def test_out_of_range_answer_index_is_rejected(answer):
+    assert validate_mcq(_obj(1, answer=answer)) is None
+
+
+def test_wrong_choice_count_is_rejected():
+    obj = _obj(1)
+    obj["choices"] = ["A", "B", "C"]
+    assert validate_mcq(obj) is None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# _generate_batch 재시도
+# ─────────────────────────────────────────────────────────────────────────────
+def test_retry_requests_only_missing_count(monkeypatch):
+    requested = []
+    replies = iter([3, 1, 5])
+
+    def fake_request(context, n):
+        requested.append(n)
+        got = min(next(replies), n)
+        return [validate_mcq(_obj(len(requested) * 10 + i)) for i in range(got)], 1
+
+    monkeypatch.setattr(mcq, "_request_mcqs", fake_request)
+    monkeypatch.setattr(mcq, "MCQ_PARSE_RETRIES", 2)
+    items = mcq._generate_batch([], 5)
+    assert requested == [5, 2, 1]
+    assert len(items) == 5
+
+
+def test_retry_stops_after_parse_retries(monkeypatch):
+    requested = []
+
+    def fake_request(context, n):
+        requested.append(n)
+        return [], 2
+
+    monkeypatch.setattr(mcq, "_request_mcqs", fake_request)
+    monkeypatch.setattr(mcq, "MCQ_PARSE_RETRIES", 2)
+    assert mcq._generate_batch([], 4) == []
+    assert requested == [4, 4, 4]
@@ -0,0 +1,120 @@
+# backend/utils/ann.py
+import os
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# build_vector_store 기본 인덱스 종류: flat | ivf_flat | hnsw | ivf_pq | auto
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "auto")
+# auto 선택 기준 (벡터 수)
+AUTO_HNSW_MIN = int(os.getenv("FAISS_AUTO_HNSW_MIN", "20000"))
+AUTO_IVFPQ_MIN = int(os.getenv("FAISS_AUTO_IVFPQ_MIN", "200000"))
+# IVF/PQ 학습에 사용할 최대 샘플 수
+TRAIN_SAMPLE_SIZE = int(os.getenv("FAISS_TRAIN_SAMPLE", "50000"))
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+PQ_NBITS = 8
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """벡터 수에 따라 인덱스 종류 자동 선택"""
+    if n_vectors >= AUTO_IVFPQ_MIN:
+        return "ivf_pq"
+    if n_vectors >= AUTO_HNSW_MIN:
+        return "hnsw"
+    return "flat"
+
+
+def _nlist(n_vectors: int) -> int:
+    # 경험적으로 4*sqrt(N) 정도, 학습 샘플이 클러스터당 39개 이상 되도록 제한
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _pq_m(dim: int) -> Optional[int]:
+    """부분 벡터 하나가 가능하면 8차원이 되도록 dim의 약수 중에서 선택"""
+    for sub_dim in (8, 4, 16, 12, 24, 32):
+        if dim % sub_dim == 0:
+            return dim // sub_dim
+    return None
+
+
+def _train_sample(vectors: np.ndarray, size: int = TRAIN_SAMPLE_SIZE) -> np.ndarray:
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(0)
+    return vectors[rng.choice(len(vectors), size=size, replace=False)]
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str) -> faiss.Index:
+    """
+    vectors(float32, N x d)로 지정한 종류의 L2 인덱스를 만들어 반환합니다.
+    학습에 필요한 벡터가 부족하면 flat으로 대신합니다.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 인덱스 종류: {index_type}")
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        index.add(vectors)
+        return index
+
+    nlist = _nlist(n)
+    m = _pq_m(dim)
+    trainable = nlist >= 2 and (index_type != "ivf_pq" or (m and n >= 39 * (1 << PQ_NBITS)))
+    if index_type == "flat" or not trainable:
+        index = faiss.IndexFlatL2(dim)
+        index.add(vectors)
+        return index
+
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, PQ_NBITS)
+    index.train(_train_sample(vectors))
+    index.add(vectors)
+    index.nprobe = max(1, min(nlist, int(math.sqrt(nlist))))
+    return index
+
+
+def index_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    인덱스에 저장된 벡터를 순서대로 꺼냅니다.
+    IVF-PQ는 압축된 근사값만 복원되므로 재학습에는 쓰지 않습니다 (embedding._working_index 참고).
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def to_flat(index: faiss.Index) -> faiss.Index:
+    """추가/삭제가 자유로운 IndexFlatL2로 변환 (이미 flat이면 그대로)"""
+    if isinstance(index, faiss.IndexFlat):
+        return index
+    flat = faiss.IndexFlatL2(index.d)
+    flat.add(index_vectors(index))
+    return flat
+
+
+def index_type_of(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
@@ -0,0 +1,135 @@
+# backend/utils/answer_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.store_cache import index_signature
+
+# 질문 임베딩 코사인 유사도가 이 값 이상이면 같은 질문으로 보고 저장된 답변을 재사용
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_PER_INDEX = int(os.getenv("ANSWER_CACHE_MAX_PER_INDEX", "500"))
+
+
+class _Bucket:
+    """한 faiss_index에 대한 (질문 벡터, 답변) 목록. 순서가 곧 LRU 순서"""
+
+    def __init__(self, signature: Tuple[int, int]):
+        self.signature = signature
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.next_id = 0
+
+
+class AnswerCache:
+    """
+    faiss_index별 의미 기반 답변 캐시.
+    - 질문 임베딩과 코사인 유사도 threshold 이상인 이전 질문이 있으면 답변/출처 재사용
+    - TTL이 지난 항목과, 인덱스별 max_entries를 넘는 오래된 항목은 제거
+    - faiss_index/가 다시 쓰이면(재학습) 해당 인덱스의 캐시 전체를 버림
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_PER_INDEX,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vec: List[float]) -> np.ndarray:
+        arr = np.asarray(vec, dtype="float32")
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+
+    def _bucket(self, index_dir: str) -> _Bucket:
+        key = os.path.abspath(index_dir)
+        signature = index_signature(key)
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.signature != signature:
+            bucket = self._buckets[key] = _Bucket(signature)
+        return bucket
+
+    def lookup(self, index_dir: str, query_vec: List[float]) -> Optional[Dict[str, Any]]:
+        q = self._unit(query_vec)
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(index_dir)
+            for eid in [e for e, v in bucket.entries.items() if now - v["created"] > self.ttl]:
+                del bucket.entries[eid]
+            best_id, best_score = None, -1.0
+            for eid, entry in bucket.entries.items():
+                score = float(np.dot(q, entry["vec"]))
+                if score > best_score:
+                    best_id, best_score = eid, score
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+            bucket.entries.move_to_end(best_id)
+            self.hits += 1
+            entry = bucket.entries[best_id]
+            return {
+                "answer": entry["answer"],
+                "sources": entry["sources"],
+                "similarity": round(best_score, 4),
+            }
+
+    def store(
+        self, index_dir: str, query_vec: List[float], answer: str, sources: List[Dict[str, Any]]
+    ) -> None:
+        with self._lock:
+            bucket = self._bucket(index_dir)
+            bucket.entries[bucket.next_id] = {
+                "vec": self._unit(query_vec),
+                "answer": answer,
+                "sources": sources,
+                "created": time.time(),
+            }
+            bucket.next_id += 1
+            while len(bucket.entries) > self.max_entries:
+                bucket.entries.popitem(last=False)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """path(챗봇 폴더 또는 faiss_index) 아래의 캐시를 비움. None이면 전부"""
+        with self._lock:
+            if path is None:
+                self._buckets.clear()
+                return
+            prefix = os.path.abspath(path)
+            for key in [k for k in self._buckets if k == prefix or k.startswith(prefix + os.sep)]:
+                del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "indexes": len(self._buckets),
+                "entries": sum(len(b.entries) for b in self._buckets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "threshold": self.threshold,
+            }
+
+
+_answer_cache = AnswerCache()
+
+
+def get_answer_cache() -> AnswerCache:
+    return _answer_cache
+
+
+def invalidate_answers(path: Optional[str] = None) -> None:
+    _answer_cache.invalidate(path)
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _answer_cache.stats()
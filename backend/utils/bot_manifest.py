@@ -0,0 +1,165 @@
+# backend/utils/bot_manifest.py
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.compact_store import has_vector_index
+
+# data/<company>/<team>/<part>/ 안에 저장되는 파트별 챗봇 목록
+BOT_MANIFEST_FILE = "bots.json"
+
+PartKey = Tuple[str, str, str]
+
+
+class BotRegistry:
+    """
+    파트별 챗봇 목록(name, pdf_url, createdAt, lastTrainedAt, 인덱스 통계)을 메모리에 유지합니다.
+    - 파트를 처음 조회할 때 bots.json을 읽고, 없으면 한 번만 디렉터리를 훑어 생성
+    - 학습 완료 / delete_chatbot이 제자리에서 갱신하고 bots.json을 원자적으로 저장
+      (업로드만 되고 학습이 실패·취소된 챗봇은 목록에 넣지 않음)
+    - 목록 조회는 정렬된 캐시를 그대로 반환 (파일 시스템 접근 없음)
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._parts: Dict[PartKey, Dict[str, Dict[str, Any]]] = {}
+        self._sorted: Dict[PartKey, List[Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+
+    def _part_dir(self, key: PartKey) -> str:
+        return os.path.join(self.data_dir, *key)
+
+    def _manifest_path(self, key: PartKey) -> str:
+        return os.path.join(self._part_dir(key), BOT_MANIFEST_FILE)
+
+    # ── 로드 / 저장 ──
+    def _scan_bot(self, key: PartKey, name: str) -> Optional[Dict[str, Any]]:
+        """bots.json이 없을 때 기존 방식대로 챗봇 폴더 하나를 훑어 항목 생성"""
+        bot_dir = os.path.join(self._part_dir(key), name)
+        faiss_dir = os.path.join(bot_dir, "faiss_index")
+        if not has_vector_index(faiss_dir):
+            return None
+        pdf_url = None
+        pdf_folder = os.path.join(bot_dir, "pdf")
+        if os.path.isdir(pdf_folder):
+            for fname in sorted(os.listdir(pdf_folder)):
+                if fname.lower().endswith(".pdf"):
+                    pdf_url = self.static_url(os.path.join(pdf_folder, fname))
+                    break
+        try:
+            c = os.path.getctime(faiss_dir)
+            m = os.path.getmtime(faiss_dir)
+        except OSError:
+            c = m = time.time()
+        return {
+            "name": name,
+            "pdf_url": pdf_url,
+            "createdAt": int(c * 1000),
+            "lastTrainedAt": int(m * 1000),
+            "stats": {},
+        }
+
+    def _load(self, key: PartKey) -> Dict[str, Dict[str, Any]]:
+        bots = self._parts.get(key)
+        if bots is not None:
+            return bots
+        bots = {}
+        path = self._manifest_path(key)
+        loaded = False
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    bots = json.load(f).get("bots", {})
+                loaded = True
+            except (json.JSONDecodeError, IOError, AttributeError):
+                bots = {}
+        if not loaded:
+            part_dir = self._part_dir(key)
+            names = os.listdir(part_dir) if os.path.isdir(part_dir) else []
+            for name in names:
+                entry = self._scan_bot(key, name)
+                if entry is not None:
+                    bots[name] = entry
+            if os.path.isdir(part_dir):
+                self._save(key, bots)
+        self._parts[key] = bots
+        self._sorted.pop(key, None)
+        return bots
+
+    def _save(self, key: PartKey, bots: Dict[str, Dict[str, Any]]) -> None:
+        """임시 파일에 쓴 뒤 교체하여 원자적으로 저장"""
+        path = self._manifest_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"bots": bots}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def _changed(self, key: PartKey) -> None:
+        self._sorted.pop(key, None)
+        self._save(key, self._parts[key])
+
+    def static_url(self, path: str) -> str:
+        rel = os.path.relpath(path, self.data_dir).replace("\\", "/")
+        return f"/static/{rel}"
+
+    # ── 조회 ──
+    def list(self, company: str, team: str, part: str) -> List[Dict[str, Any]]:
+        """최근 생성 순으로 정렬된 챗봇 목록 (GET /chatbots 응답 항목 형태)"""
+        key = (company, team, part)
+        with self._lock:
+            cached = self._sorted.get(key)
+            if cached is None:
+                bots = self._load(key)
+                cached = sorted(
+                    (
+                        dict(
+                            entry,
+                            company=company,
+                            team=team,
+                            part=part,
+                            indexPath=os.path.join(self._part_dir(key), name, "faiss_index"),
+                        )
+                        for name, entry in bots.items()
+                    ),
+                    key=lambda x: x["createdAt"],
+                    reverse=True,
+                )
+                self._sorted[key] = cached
+            return cached
+
+    # ── 갱신 ──
+    def upsert(self, company: str, team: str, part: str, name: str, **fields: Any) -> None:
+        """챗봇 항목을 추가하거나 fields로 갱신 (stats는 기존 값에 병합)"""
+        key = (company, team, part)
+        now = int(time.time() * 1000)
+        with self._lock:
+            bots = self._load(key)
+            entry = bots.setdefault(
+                name,
+                {"name": name, "pdf_url": None, "createdAt": now, "lastTrainedAt": now, "stats": {}},
+            )
+            stats = fields.pop("stats", None)
+            entry.update(fields)
+            if stats:
+                entry["stats"] = dict(entry.get("stats") or {}, **stats)
+            self._changed(key)
+
+    def remove(self, company: str, team: str, part: str, name: str) -> None:
+        key = (company, team, part)
+        with self._lock:
+            bots = self._load(key)
+            if bots.pop(name, None) is not None:
+                self._changed(key)
+
+    def refresh(self, company: str, team: str, part: str) -> None:
+        """bots.json을 버리고 디렉터리를 다시 훑어 재생성"""
+        key = (company, team, part)
+        with self._lock:
+            path = self._manifest_path(key)
+            if os.path.isfile(path):
+                os.remove(path)
+            self._parts.pop(key, None)
+            self._load(key)
@@ -0,0 +1,243 @@
+# backend/utils/compact_store.py
+import os
+import glob
+import json
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Mapping, Optional, Union
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+
+# 인덱스 저장 형식: compact(index.<세대>.faiss + docstore.sqlite) | pickle(FAISS.save_local의 index.faiss + index.pkl)
+INDEX_FORMAT = os.getenv("INDEX_FORMAT", "compact")
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+PICKLE_FILE = "index.pkl"
+
+
+class IndexMismatchError(RuntimeError):
+    """docstore.sqlite가 가리키는 세대의 벡터 파일이 없거나 맞지 않음 (저장 중인 인덱스를 읽은 경우)"""
+
+
+class ReadOnlyDocstoreError(RuntimeError):
+    """검색용으로 연 SQLite docstore를 수정하려 함"""
+
+
+class SQLiteDocstore(Docstore):
+    """
+    docstore.sqlite에서 청크를 하나씩 읽는 읽기 전용 docstore.
+    열 때 아무것도 메모리에 올리지 않으므로 로드 시간/메모리가 청크 수와 무관합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # 연결은 이 객체가 살아 있는 동안 유지 (경로로 다시 열면 교체된 다른 세대를 읽게 됨)
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+    def search(self, search: str) -> Union[str, Document]:
+        rows = self._query("SELECT text, metadata FROM chunks WHERE doc_id=?", (search,))
+        if not rows:
+            return f"ID {search} not found."
+        text, metadata = rows[0]
+        return Document(id=search, page_content=text, metadata=json.loads(metadata))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise ReadOnlyDocstoreError("읽기 전용 docstore입니다. load_vector_store(lazy=False)로 여세요.")
+
+    def delete(self, ids: List) -> None:
+        raise ReadOnlyDocstoreError("읽기 전용 docstore입니다. load_vector_store(lazy=False)로 여세요.")
+
+    def meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key=?", (key,))
+        return rows[0][0] if rows else None
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteIdMap(Mapping):
+    """
+    FAISS 위치(pos) → docstore ID 매핑 (FAISS.index_to_docstore_id 대용).
+    조회할 때마다 기본 키 인덱스로 한 행만 읽습니다.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._docstore = docstore
+        self._len: Optional[int] = None
+
+    def __getitem__(self, pos: int) -> str:
+        rows = self._docstore._query("SELECT doc_id FROM chunks WHERE pos=?", (int(pos),))
+        if not rows:
+            raise KeyError(pos)
+        return rows[0][0]
+
+    def __iter__(self) -> Iterator[int]:
+        return (r[0] for r in self._docstore._query("SELECT pos FROM chunks ORDER BY pos"))
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self._docstore._query("SELECT COUNT(*) FROM chunks")[0][0]
+        return self._len
+
+    # 전체 순회는 행마다 질의하지 않고 한 번에 읽음
+    def values(self) -> List[str]:  # type: ignore[override]
+        return [r[0] for r in self._docstore._query("SELECT doc_id FROM chunks ORDER BY pos")]
+
+    def items(self) -> List[tuple]:  # type: ignore[override]
+        return self._docstore._query("SELECT pos, doc_id FROM chunks ORDER BY pos")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_docstore(store: FAISS, tmp: str, generation: str) -> None:
+    _remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute(
+            "CREATE TABLE chunks (pos INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        def rows():
+            for pos, doc_id in sorted(store.index_to_docstore_id.items()):
+                doc = store.docstore.search(doc_id)
+                yield (
+                    int(pos),
+                    doc_id,
+                    doc.page_content,
+                    json.dumps(doc.metadata or {}, ensure_ascii=False),
+                )
+
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows())
+        conn.execute("INSERT INTO meta VALUES ('ntotal', ?)", (str(store.index.ntotal),))
+        conn.execute("INSERT INTO meta VALUES ('generation', ?)", (generation,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _generation_file(index_dir: str, generation: str) -> str:
+    return os.path.join(index_dir, f"index.{generation}.faiss")
+
+
+def _remove_stale_generations(index_dir: str, keep: Optional[str] = None) -> None:
+    """
+    keep 이외 세대의 벡터 파일 삭제.
+    이미 mmap으로 열어 둔 쪽은 계속 읽을 수 있고, 아직 열기 전이던 로드는 IndexMismatchError로 다시 시도합니다.
+    """
+    for path in glob.glob(os.path.join(index_dir, "index.*.faiss")):
+        if keep is None or path != _generation_file(index_dir, keep):
+            _remove(path)
+
+
+def save_vector_store(store: FAISS, index_dir: str, index_format: str = INDEX_FORMAT) -> None:
+    """
+    인덱스를 index_format으로 저장합니다.
+    compact: 벡터는 새 세대 이름(index.<세대>.faiss)으로 쓰고, 그 세대를 기록한 docstore.sqlite를
+             마지막에 한 번 교체해 반영합니다. 로드는 항상 docstore가 가리키는 세대의 벡터를 열므로
+             청크 수가 같아도 새 docstore와 이전 벡터가 짝지어지지 않습니다.
+    다른 형식의 파일은 지워서 로드할 때 형식이 헷갈리지 않게 합니다.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    if index_format == "pickle":
+        store.save_local(index_dir)
+        _remove(os.path.join(index_dir, DOCSTORE_FILE))
+        _remove_stale_generations(index_dir)
+        return
+    if index_format != "compact":
+        raise ValueError(f"지원하지 않는 인덱스 형식: {index_format}")
+    generation = uuid.uuid4().hex
+    docstore_path = os.path.join(index_dir, DOCSTORE_FILE)
+    _write_docstore(store, docstore_path + ".tmp", generation)
+    faiss.write_index(store.index, _generation_file(index_dir, generation))
+    os.replace(docstore_path + ".tmp", docstore_path)
+    _remove_stale_generations(index_dir, keep=generation)
+    _remove(os.path.join(index_dir, INDEX_FILE))
+    _remove(os.path.join(index_dir, PICKLE_FILE))
+
+
+def _read_index_mmap(path: str) -> faiss.Index:
+    """벡터를 mmap으로 열기 (지원하지 않는 인덱스 종류면 일반 로드)"""
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+def load_compact_store(index_dir: str, embeddings: Embeddings, lazy: bool = True) -> FAISS:
+    """
+    lazy=True: 벡터는 mmap, 청크는 조회할 때 SQLite에서 하나씩 (검색 전용)
+    lazy=False: 전부 메모리로 읽어 추가/삭제가 가능한 일반 FAISS 객체로 (재학습용)
+    """
+    sqlite_docstore = SQLiteDocstore(os.path.join(index_dir, DOCSTORE_FILE))
+    docstore: Docstore = sqlite_docstore
+    try:
+        generation = sqlite_docstore.meta("generation")
+        # 세대가 없는 docstore는 index.faiss를 쓰던 이전 compact 형식
+        index_path = (
+            _generation_file(index_dir, generation) if generation else os.path.join(index_dir, INDEX_FILE)
+        )
+        try:
+            index = _read_index_mmap(index_path) if lazy else faiss.read_index(index_path)
+        except RuntimeError as e:
+            if os.path.isfile(index_path):
+                raise
+            # 이 docstore를 연 뒤 다음 저장이 이 세대의 벡터 파일을 지운 경우
+            raise IndexMismatchError(f"{index_dir}: docstore가 가리키는 벡터 파일이 없습니다 ({index_path}).") from e
+        if lazy:
+            id_map: Mapping = SQLiteIdMap(sqlite_docstore)
+        else:
+            id_map = dict(SQLiteIdMap(sqlite_docstore).items())
+            docstore = InMemoryDocstore(
+                {doc_id: sqlite_docstore.search(doc_id) for doc_id in id_map.values()}
+            )
+            sqlite_docstore.close()
+        if index.ntotal != len(id_map):
+            raise IndexMismatchError(
+                f"{index_dir}: 인덱스({index.ntotal})와 docstore({len(id_map)})의 청크 수가 다릅니다."
+            )
+    except BaseException:
+        sqlite_docstore.close()
+        raise
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=id_map,
+    )
+
+
+def has_compact_store(index_dir: str) -> bool:
+    return os.path.isfile(os.path.join(index_dir, DOCSTORE_FILE))
+
+
+def is_index_data_file(name: str) -> bool:
+    """인덱스 내용이 바뀔 때만 다시 쓰이는 파일인지 (체크포인트/매니페스트/임시 파일 제외)"""
+    return name in (DOCSTORE_FILE, INDEX_FILE, PICKLE_FILE) or (
+        name.startswith("index.") and name.endswith(".faiss")
+    )
+
+
+def has_vector_index(index_dir: str) -> bool:
+    """학습된 인덱스가 있는지 (compact / pickle 형식 모두)"""
+    return has_compact_store(index_dir) or os.path.isfile(os.path.join(index_dir, INDEX_FILE))
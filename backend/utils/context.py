@@ -0,0 +1,112 @@
+# backend/utils/context.py
+import os
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.documents.base import Document
+
+from utils.tokens import count_tokens, truncate_tokens
+
+# LLM에 넣을 컨텍스트의 최대 토큰 수
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# 예산이 이보다 적게 남으면 잘라서라도 넣지 않고 멈춤
+CONTEXT_MIN_PASSAGE_TOKENS = int(os.getenv("CONTEXT_MIN_PASSAGE_TOKENS", "64"))
+# 두 청크의 끝/시작이 이 글자 수 이상 겹쳐야 이어붙임
+MERGE_MIN_OVERLAP = 20
+
+
+def _overlap(a: str, b: str) -> int:
+    """a의 끝과 b의 시작이 겹치는 최대 길이 (MERGE_MIN_OVERLAP 미만이면 0)"""
+    for k in range(min(len(a), len(b)), MERGE_MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+
+def _merge_texts(texts: List[str]) -> List[str]:
+    """포함되는 청크는 버리고, 끝/시작이 겹치는 청크는 하나로 이어붙임"""
+    pieces = [t.strip() for t in texts if t and t.strip()]
+    changed = True
+    while changed and len(pieces) > 1:
+        changed = False
+        for i in range(len(pieces)):
+            for j in range(len(pieces)):
+                if i == j:
+                    continue
+                a, b = pieces[i], pieces[j]
+                if b in a:
+                    merged = a
+                else:
+                    k = _overlap(a, b)
+                    if not k:
+                        continue
+                    merged = a + b[k:]
+                pieces[i] = merged
+                del pieces[j]
+                changed = True
+                break
+            if changed:
+                break
+    return pieces
+
+
+def merge_page_chunks(docs: List[Document]) -> List[Dict[str, Any]]:
+    """
+    같은 (PDF, 페이지)의 청크를 하나의 단락으로 합칩니다.
+    단락 순서는 각 페이지의 첫 청크가 검색된 순위를 따릅니다.
+    반환: [{"pdf_name", "page", "image_path", "text", "chunks"}]
+    """
+    groups: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    for doc in docs:
+        md = doc.metadata or {}
+        key = (md.get("pdf_name", "UnknownPDF"), md.get("page", None))
+        group = groups.setdefault(
+            key,
+            {"pdf_name": key[0], "page": key[1], "image_path": md.get("image_path"), "texts": []},
+        )
+        group["texts"].append(doc.page_content or "")
+
+    passages: List[Dict[str, Any]] = []
+    for group in groups.values():
+        texts = group.pop("texts")
+        group["text"] = "\n".join(_merge_texts(texts))
+        group["chunks"] = len(texts)
+        passages.append(group)
+    return passages
+
+
+def passage_header(passage: Dict[str, Any]) -> str:
+    # 컨텍스트 문자열 예시: "[reportA.pdf - Page 3]\n해당 페이지 텍스트..."
+    if passage["page"] is not None:
+        return f"[{passage['pdf_name']} - Page {passage['page'] + 1}]\n"
+    # page 정보가 없으면 그냥 pdf 이름만 붙임
+    return f"[{passage['pdf_name']}]\n"
+
+
+def fit_to_budget(
+    passages: List[Dict[str, Any]], budget: int = CONTEXT_TOKEN_BUDGET
+) -> Tuple[List[str], List[Dict[str, Any]], int]:
+    """
+    순위대로 단락을 넣다가 예산을 넘으면 마지막 단락을 토큰 단위로 잘라 넣고 멈춥니다.
+    반환: (컨텍스트 파트들, 실제로 들어간 단락들, 사용한 토큰 수)
+    """
+    parts: List[str] = []
+    used_passages: List[Dict[str, Any]] = []
+    used = 0
+    for passage in passages:
+        header = passage_header(passage)
+        part = header + passage["text"]
+        # 파트 사이 구분자("\n\n")도 예산에 포함
+        cost = count_tokens(part) + (1 if parts else 0)
+        if used + cost <= budget:
+            parts.append(part)
+            used_passages.append(passage)
+            used += cost
+            continue
+        remaining = budget - used - count_tokens(header) - (1 if parts else 0)
+        if remaining >= CONTEXT_MIN_PASSAGE_TOKENS:
+            part = header + truncate_tokens(passage["text"], remaining)
+            parts.append(part)
+            used_passages.append(passage)
+            used += count_tokens(part) + (1 if len(parts) > 1 else 0)
+        break
+    return parts, used_passages, used
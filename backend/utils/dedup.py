@@ -0,0 +1,140 @@
+# backend/utils/dedup.py
+import os
+import re
+import hashlib
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.documents.base import Document
+
+# 근사 중복(SimHash) 검출 사용 여부와 허용 해밍 거리 (64비트 기준, 최대 3까지 지원)
+DEDUP_NEAR = os.getenv("DEDUP_NEAR", "0") == "1"
+DEDUP_SIMHASH_DISTANCE = min(3, int(os.getenv("DEDUP_SIMHASH_DISTANCE", "3")))
+
+_WS_RE = re.compile(r"\s+")
+_MASK64 = (1 << 64) - 1
+
+
+def normalize_chunk(text: str) -> str:
+    """중복 판정용 정규화: NFKC + 소문자 + 공백 정리"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _WS_RE.sub(" ", text).strip()
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """문자 n-gram 기반 64비트 SimHash"""
+    weights = [0] * 64
+    if len(text) < shingle:
+        grams = [text]
+    else:
+        grams = [text[i : i + shingle] for i in range(len(text) - shingle + 1)]
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    value = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value & _MASK64
+
+
+def _bands(value: int) -> List[Tuple[int, int]]:
+    # 해밍 거리 3 이하인 두 해시는 16비트 블록 4개 중 최소 하나가 같음 (비둘기집 원리)
+    return [(i, (value >> (16 * i)) & 0xFFFF) for i in range(4)]
+
+
+def _merge_metadata(md: Dict[str, Any], dup: Document) -> None:
+    pages = md.setdefault("pages", [md["page"]] if md.get("page") is not None else [])
+    page = dup.metadata.get("page")
+    if page is not None and page not in pages:
+        pages.append(page)
+        pages.sort()
+    md["duplicates"] = md.get("duplicates", 0) + 1
+
+
+class ChunkDeduper:
+    """
+    청크를 순서대로 받아 처음 나온 것만 통과시키는 중복 제거기.
+    - 정확 중복: 정규화 텍스트의 sha1이 같으면 제거
+    - 근사 중복(near=True): SimHash 해밍 거리가 max_distance 이하이면 제거
+    - existing: 이 챗봇 인덱스에 다른 PDF로 이미 저장된 청크 해시. 같은 청크는 다시
+      임베딩/저장하지 않고 shared_hashes에 {해시: 이 PDF에서 나온 페이지}로 기록
+      (매니페스트가 공유 관계를 추적하고, 소유 PDF가 바뀌면 출처를 이 페이지로 고침)
+    통과한 청크에는 metadata["chunk_hash"]를 붙입니다.
+    제거된 청크의 페이지는 남은 청크의 metadata["pages"]에 합쳐집니다. filter()는 제너레이터라
+    이미 내보낸 청크의 metadata가 나중에 바뀔 수 있으므로, build_vector_store는 저장 직전에
+    바뀐 metadata를 docstore에 다시 반영합니다.
+    """
+
+    def __init__(
+        self,
+        near: bool = DEDUP_NEAR,
+        max_distance: int = DEDUP_SIMHASH_DISTANCE,
+        existing: Optional[Set[str]] = None,
+    ):
+        self.near = near
+        self.max_distance = max_distance
+        self.existing = existing or set()
+        self.shared_hashes: Dict[str, List[int]] = {}
+        self.stats = {"input": 0, "output": 0, "exact": 0, "near": 0, "existing": 0}
+        # 스트리밍 중에도 메모리가 청크 본문에 비례해 늘지 않도록 통과한 청크의 metadata만 보관
+        self._by_hash: Dict[str, Dict[str, Any]] = {}
+        self._bands: Dict[Tuple[int, int], List[Tuple[int, Dict[str, Any]]]] = {}
+
+    def filter(self, docs: Iterable[Document]) -> Iterator[Document]:
+        for doc in docs:
+            self.stats["input"] += 1
+            norm = normalize_chunk(doc.page_content)
+            digest = hashlib.sha1(norm.encode("utf-8")).hexdigest()
+            original = self._by_hash.get(digest)
+            if original is not None:
+                _merge_metadata(original, doc)
+                self.stats["exact"] += 1
+                continue
+            if digest in self.existing:
+                pages = self.shared_hashes.setdefault(digest, [])
+                page = doc.metadata.get("page")
+                if page is not None and page not in pages:
+                    pages.append(page)
+                    pages.sort()
+                self.stats["existing"] += 1
+                continue
+
+            if self.near:
+                sh = simhash(norm)
+                match: Optional[Dict[str, Any]] = None
+                for band in _bands(sh):
+                    for other_hash, other in self._bands.get(band, ()):
+                        if bin(sh ^ other_hash).count("1") <= self.max_distance:
+                            match = other
+                            break
+                    if match is not None:
+                        break
+                if match is not None:
+                    _merge_metadata(match, doc)
+                    self._by_hash[digest] = match
+                    self.stats["near"] += 1
+                    continue
+                for band in _bands(sh):
+                    self._bands.setdefault(band, []).append((sh, doc.metadata))
+
+            doc.metadata["chunk_hash"] = digest
+            self._by_hash[digest] = doc.metadata
+            self.stats["output"] += 1
+            yield doc
+
+
+def dedupe_documents(
+    docs: Iterable[Document],
+    near: bool = DEDUP_NEAR,
+    max_distance: int = DEDUP_SIMHASH_DISTANCE,
+    existing: Optional[Set[str]] = None,
+) -> Tuple[List[Document], Dict[str, Any]]:
+    """
+    분할된 청크에서 반복되는 머리말/꼬리말/안전 문구 등을 한 번만 남깁니다 (ChunkDeduper 참고).
+    반환값: (중복 제거된 청크 리스트, {"input", "output", "exact", "near", "existing"})
+    """
+    deduper = ChunkDeduper(near, max_distance, existing)
+    kept = list(deduper.filter(docs))
+    return kept, deduper.stats
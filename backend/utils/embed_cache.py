@@ -0,0 +1,190 @@
+# backend/utils/embed_cache.py
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from langchain_core.embeddings import Embeddings
+from starlette.concurrency import run_in_threadpool
+
+# 캐시 위치/크기 설정 (data/ 아래에 두면 로그인 트리에 회사로 잡히므로 별도 폴더 사용)
+CACHE_DIR = os.getenv(
+    "CHATBOT_CACHE_DIR", os.path.join(os.path.dirname(__file__), "../cache")
+)
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite")
+)
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "20000"))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC 정규화 + 공백 정리. 캐시 키 생성용"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WS_RE.sub(" ", text).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (model, 정규화 텍스트) → 벡터 캐시.
+    - 1단계: 프로세스 메모리 LRU
+    - 2단계: SQLite 파일 (float32 BLOB) — 서버 재시작 후에도 유지
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = EMBED_CACHE_PATH,
+        max_memory_items: int = EMBED_CACHE_MEMORY_ITEMS,
+    ):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, vec BLOB NOT NULL)"
+            )
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            conn = self._db()
+            if missing and conn is not None:
+                # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+                for i in range(0, len(missing), 500):
+                    part = missing[i : i + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = conn.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        vec = array("f", blob).tolist()
+                        found[key] = vec
+                        self._remember(key, vec)
+                        self.disk_hits += 1
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            for key, vec in items.items():
+                self._remember(key, vec)
+            conn = self._db()
+            if conn is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vec) VALUES (?, ?, ?)",
+                    [(k, model, array("f", v).tobytes()) for k, v in items.items()],
+                )
+                conn.commit()
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_items": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else None,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임의의 LangChain Embeddings를 감싸 EmbeddingCache를 거치게 합니다.
+    캐시에 없는 텍스트만 한 번의 배치 호출로 원본 모델에 보냅니다.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model, t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        # 캐시 미스 텍스트만 중복 없이 모아서 임베딩
+        todo: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in todo:
+                todo[key] = text
+        if todo:
+            vectors = self.underlying.embed_documents(list(todo.values()))
+            fresh = dict(zip(todo.keys(), vectors))
+            self.cache.put_many(self.model, fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.model, text)
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key]
+        vec = self.underlying.embed_query(text)
+        self.cache.put_many(self.model, {key: vec})
+        return vec
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # 캐시 조회/저장은 SQLite I/O와 전역 락을 거치므로 스레드풀에서,
+        # 미스일 때만 원본 모델의 비동기 API 사용
+        key = cache_key(self.model, text)
+        found = await run_in_threadpool(self.cache.get_many, [key])
+        if key in found:
+            return found[key]
+        vec = await self.underlying.aembed_query(text)
+        await run_in_threadpool(self.cache.put_many, self.model, {key: vec})
+        return vec
+
+
+_embedding_cache = EmbeddingCache()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return _embedding_cache
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    return _embedding_cache.stats()
@@ -1,37 +1,512 @@
 import os
-from typing import List
+import json
+import time
+import logging
+import random
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Iterable, Iterator, Dict, Any, Optional, Callable
 
+import faiss
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+
+from utils.embed_cache import CachedEmbeddings, get_embedding_cache
+from utils.ann import INDEX_TYPE, build_ann_index, index_type_of, index_vectors, to_flat
+from utils.compact_store import (
+    IndexMismatchError,
+    has_compact_store,
+    has_vector_index,
+    load_compact_store,
+    save_vector_store,
+)
+from utils.index_manifest import (
+    chunk_id,
+    load_manifest,
+    save_manifest,
+    record_source,
+    release_source,
+)
 
 # 임베딩 모델 이름을 rag.py와 동일하게 text-embedding-3-small로 설정
 EMBEDDING_MODEL_NAME = "text-embedding-3-small"
 
+# "openai"(기본) 또는 "fake"(로컬 테스트/벤치마크용, 네트워크 호출 없음)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+FAKE_EMBEDDING_DIM = 1536
+FAKE_EMBED_LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "0"))
+
+# 배치 임베딩 파이프라인 설정
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+CHECKPOINT_EVERY = int(os.getenv("EMBED_CHECKPOINT_EVERY", "10"))  # N배치마다 저장
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "_ingest_checkpoint.json"
+PARTIAL_DIR = "_partial"
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    텍스트 해시로 시드를 정한 결정적 난수 벡터를 돌려주는 로컬 임베딩.
+    latency_ms로 API 왕복 시간을 흉내 낼 수 있습니다.
+    """
+
+    def __init__(self, size: int = FAKE_EMBEDDING_DIM, latency_ms: float = FAKE_EMBED_LATENCY_MS):
+        self.size = size
+        self.latency_ms = latency_ms
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.size).astype("float32")
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    임베딩 캐시(메모리 LRU + SQLite)를 거치는 임베딩 객체를 반환합니다.
+    질의/문서 임베딩 모두 이 함수를 통해 생성합니다.
+    """
+    if EMBEDDING_BACKEND == "fake":
+        return CachedEmbeddings(
+            FakeEmbeddings(), model=f"fake-{FAKE_EMBEDDING_DIM}", cache=get_embedding_cache()
+        )
+    return CachedEmbeddings(
+        OpenAIEmbeddings(model=EMBEDDING_MODEL_NAME),
+        model=EMBEDDING_MODEL_NAME,
+        cache=get_embedding_cache(),
+    )
+
+
+def _batched(items: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _batch_hash(batch: List[Document]) -> str:
+    h = hashlib.sha1()
+    for doc in batch:
+        h.update(doc.page_content.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _embed_with_retry(
+    embeddings: Embeddings, texts: List[str], max_retries: int = EMBED_MAX_RETRIES
+) -> List[List[float]]:
+    """지수 백오프(+지터)로 재시도하며 한 배치를 임베딩"""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = min(30.0, 0.5 * (2 ** attempt)) * (0.5 + random.random())
+            logger.warning(
+                "배치 임베딩 실패(%r), %.1fs 후 재시도 %d/%d", e, delay, attempt + 1, max_retries
+            )
+            time.sleep(delay)
+
+
+# 같은 인덱스를 고치는 인제스트 작업끼리는 순서대로 실행 (index_dir 절대 경로 → 락)
+_index_locks: Dict[str, threading.RLock] = {}
+_index_locks_guard = threading.Lock()
+
+
+def index_lock(index_dir: str) -> threading.RLock:
+    """
+    index_dir 하나에 대한 재진입 가능 락.
+    인덱스/매니페스트를 읽고-고치고-저장하는 구간을 감싸면 동시에 들어온 업로드가
+    서로의 결과를 덮어쓰지 않습니다.
+    """
+    key = os.path.abspath(index_dir)
+    with _index_locks_guard:
+        lock = _index_locks.get(key)
+        if lock is None:
+            lock = _index_locks[key] = threading.RLock()
+        return lock
+
+
+def _checkpoint_key(source: Optional[str], content_hash: Optional[str]) -> str:
+    """PDF(파일명+내용 해시)마다 체크포인트 파일/부분 인덱스 폴더를 따로 둠"""
+    raw = f"{source or ''}\0{content_hash or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _checkpoint_paths(index_dir: str, key: str):
+    return (
+        os.path.join(index_dir, f"{CHECKPOINT_FILE[:-5]}.{key}.json"),
+        os.path.join(index_dir, f"{PARTIAL_DIR}.{key}"),
+    )
+
 
-def build_vector_store(documents: List[Document], index_dir: str = None) -> None:
+def _base_fingerprint(manifest: Dict[str, Any], source: Optional[str]) -> str:
+    """체크포인트를 만들 당시 인덱스에 있던 다른 PDF 목록 (바뀌었으면 이어받지 않음)"""
+    others = sorted(
+        (name, entry.get("sha256", ""))
+        for name, entry in manifest["sources"].items()
+        if name != source
+    )
+    return hashlib.sha1(json.dumps(others).encode("utf-8")).hexdigest()
+
+
+def _load_checkpoint(index_dir: str, embeddings: Embeddings, key: str, base: str):
+    """중단된 인제스트의 (완료 배치 해시 목록, 부분 인덱스, 기존 벡터 수)를 반환"""
+    ckpt_path, partial_dir = _checkpoint_paths(index_dir, key)
+    if not (os.path.isfile(ckpt_path) and os.path.isdir(partial_dir)):
+        return None
+    try:
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+        # 그사이 다른 PDF가 학습되었으면 부분 인덱스로 덮어쓰면 그 결과가 사라지므로 버림
+        if ckpt.get("base") != base:
+            _clear_checkpoint(index_dir, key)
+            return None
+        store = FAISS.load_local(partial_dir, embeddings, allow_dangerous_deserialization=True)
+        return ckpt.get("batches", []), store, ckpt.get("base_total", 0)
+    except Exception:
+        return None
+
+
+def _save_checkpoint(
+    index_dir: str, key: str, store: FAISS, done: List[str], base_total: int, base: str
+) -> None:
+    ckpt_path, partial_dir = _checkpoint_paths(index_dir, key)
+    store.save_local(partial_dir)
+    tmp = ckpt_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"batches": done, "base_total": base_total, "base": base}, f)
+    os.replace(tmp, ckpt_path)
+
+
+def _clear_checkpoint(index_dir: str, key: str) -> None:
+    ckpt_path, partial_dir = _checkpoint_paths(index_dir, key)
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    try:
+        os.remove(ckpt_path)
+    except FileNotFoundError:
+        pass
+
+
+def _hand_over(store: FAISS, manifest: Dict[str, Any], handed_over: Dict[str, Dict[str, Any]]) -> None:
+    """
+    다른 PDF 소유로 넘어간 공유 청크의 출처 metadata(pdf_name/file_path/page)를 새 소유 PDF 기준으로 고칩니다.
+    파일 경로와 전체 페이지 수는 새 소유 PDF의 다른 청크에서 가져옵니다.
+    """
+    for doc_id, info in handed_over.items():
+        doc = store.docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            continue
+        heir = info["pdf_name"]
+        md = doc.metadata
+        sibling: Optional[Dict[str, Any]] = None
+        for other_id in manifest["sources"][heir]["chunk_ids"]:
+            other = store.docstore.search(other_id) if other_id != doc_id else None
+            if isinstance(other, Document) and other.metadata.get("pdf_name") == heir:
+                sibling = other.metadata
+                break
+        file_path = sibling["file_path"] if sibling else os.path.join(
+            os.path.dirname(md.get("file_path", "")), heir
+        )
+        md.update(pdf_name=heir, source=file_path, file_path=file_path)
+        if sibling and sibling.get("total_pages") is not None:
+            md["total_pages"] = sibling["total_pages"]
+        pages = info["pages"]
+        if pages:
+            md["page"] = pages[0]
+            md["pages"] = list(pages)
+        md.pop("duplicates", None)
+
+
+def _ids_for_source(store: FAISS, manifest: Dict[str, Any], source: str) -> List[str]:
+    """
+    source(PDF 파일명)를 교체할 때 지울 docstore ID 목록.
+    다른 PDF와 공유하던 청크는 매니페스트에서 그 PDF 소유로 넘기고, 출처를 그 PDF로 고쳐 남겨 둡니다.
+    매니페스트가 없던 이전 인덱스는 metadata의 file_path로 찾습니다.
+    """
+    existing = set(store.index_to_docstore_id.values())
+    released = release_source(manifest, source)
+    if released is not None:
+        ids, handed_over = released
+        _hand_over(store, manifest, {k: v for k, v in handed_over.items() if k in existing})
+    else:
+        ids = [
+            doc_id
+            for doc_id in existing
+            if os.path.basename(
+                (store.docstore.search(doc_id).metadata or {}).get("file_path", "")
+            )
+            == source
+        ]
+    return [doc_id for doc_id in ids if doc_id in existing]
+
+
+def _working_index(store: FAISS, embeddings: Embeddings, batch_size: int) -> faiss.Index:
+    """
+    재학습 중 추가/삭제할 flat 인덱스로 변환합니다.
+    IVF-PQ는 저장된 벡터가 압축 근사값이라 그대로 복원하면 재학습마다 오차가 쌓이므로,
+    docstore의 원문을 다시 임베딩해 원래 벡터로 만듭니다 (대부분 임베딩 캐시에서 읽음).
     """
-    documents: LangChain Document 객체 리스트 (청크 분할된 상태)
+    if index_type_of(store.index) != "ivf_pq":
+        return to_flat(store.index)
+    doc_ids = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+    vectors: List[List[float]] = []
+    for start in range(0, len(doc_ids), batch_size):
+        texts = [store.docstore.search(i).page_content for i in doc_ids[start:start + batch_size]]
+        vectors.extend(_embed_with_retry(embeddings, texts))
+    return build_ann_index(np.asarray(vectors, dtype="float32").reshape(-1, store.index.d), "flat")
+
+
+def _current_index_type(index_dir: str) -> Optional[str]:
+    """저장된 인덱스의 종류 (없으면 None). compact 형식은 벡터를 mmap으로만 엽니다."""
+    if not has_vector_index(index_dir):
+        return None
+    return index_type_of(load_vector_store(index_dir).index)
+
+
+def build_vector_store(
+    documents: Iterable[Document],
+    index_dir: str = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+    progress: Optional[Callable[[int], None]] = None,
+    source: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    incremental: bool = True,
+    index_type: Optional[str] = None,
+    shared_hashes: Optional[Dict[str, List[int]]] = None,
+) -> Dict[str, Any]:
+    """
+    documents: LangChain Document 객체 iterable (청크 분할된 상태, 제너레이터 가능)
     index_dir: FAISS index를 저장할 경로. None이면 기본(data/tmp/faiss_index)에 저장
+    batch_size: 한 번의 임베딩 호출에 보낼 청크 수
+    concurrency: 동시에 진행할 임베딩 호출 수
+    progress: 누적 임베딩 청크 수를 인자로 받는 콜백
+    source: 문서 출처(PDF 파일명). 주어지면 매니페스트에 기록
+    content_hash: 원본 PDF의 sha256. 청크 ID(파일명·해시-순번)를 만들 때 사용
+    incremental: True면 기존 인덱스에 추가하고 같은 source의 이전 청크는 삭제,
+                 False면 기존 인덱스를 버리고 새로 생성
+    index_type: flat | ivf_flat | hnsw | ivf_pq | auto(벡터 수로 자동 선택)
+                임베딩은 flat 인덱스에 쌓고, 저장 직전에 지정한 종류로 변환합니다.
+                None이면 기존 인덱스의 종류를 유지하고, 새 인덱스면 INDEX_TYPE을 사용합니다.
+    shared_hashes: 다른 PDF가 이미 저장하고 있어 documents에서 뺀 청크 해시 → 이 PDF에서의 페이지
+                   (매니페스트에 기록). documents를 다 읽은 뒤에 읽으므로 스트림 도중 채워지는
+                   ChunkDeduper.shared_hashes를 그대로 넘겨도 됩니다.
+
+    배치 단위로 임베딩해 인덱스에 순서대로 추가하고, CHECKPOINT_EVERY 배치마다
+    부분 인덱스를 저장합니다. 같은 입력으로 다시 호출하면 완료된 배치는 건너뜁니다.
+    같은 index_dir에 대한 호출은 index_lock으로 한 번에 하나씩 실행됩니다.
+    반환값: {"chunks", "batches", "resumed_batches", "removed", "total",
+             "index_type", "seconds", "embedded", "chunks_per_sec"}
     """
     if index_dir is None:
         index_dir = os.path.join(os.path.dirname(__file__), "../data/tmp/faiss_index")
 
     os.makedirs(index_dir, exist_ok=True)
+    with index_lock(index_dir):
+        if index_type is None:
+            index_type = (incremental and _current_index_type(index_dir)) or INDEX_TYPE
+        return _build_vector_store(
+            documents, index_dir, batch_size, concurrency, progress,
+            source, content_hash, incremental, index_type, shared_hashes,
+        )
+
+
+def _build_vector_store(
+    documents: Iterable[Document],
+    index_dir: str,
+    batch_size: int,
+    concurrency: int,
+    progress: Optional[Callable[[int], None]],
+    source: Optional[str],
+    content_hash: Optional[str],
+    incremental: bool,
+    index_type: str,
+    shared_hashes: Optional[Dict[str, List[int]]],
+) -> Dict[str, Any]:
+    embeddings = get_embeddings()
+    manifest = load_manifest(index_dir) if incremental else {"sources": {}}
+    removed = 0
+    ckpt_key = _checkpoint_key(source, content_hash)
+    base = _base_fingerprint(manifest, source)
+    ckpt = _load_checkpoint(index_dir, embeddings, ckpt_key, base)
+    if ckpt is not None:
+        done_hashes, vector_store, base_total = ckpt
+        if source is not None:
+            # 중단 전 실행에서 한 공유 청크 인계를 매니페스트에 다시 반영 (결과는 같음)
+            release_source(manifest, source)
+    else:
+        done_hashes, vector_store = [], None
+        if incremental and has_vector_index(index_dir):
+            # 공유 캐시 객체를 건드리지 않도록 새로 (전부 메모리로) 로드해서 수정
+            vector_store = load_vector_store(index_dir, lazy=False)
+            # IVF/HNSW는 삭제·추가가 제한적이므로 작업 중에는 flat으로 되돌림
+            vector_store.index = _working_index(vector_store, embeddings, batch_size)
+            if source is not None:
+                old_ids = _ids_for_source(vector_store, manifest, source)
+                if old_ids:
+                    vector_store.delete(old_ids)
+                    removed = len(old_ids)
+        base_total = vector_store.index.ntotal if vector_store is not None else 0
+
+    resumed = 0
+    chunks = 0
+    embedded = 0
+    n_batches = 0
+    new_ids: List[str] = []
+    new_hashes: List[str] = []
+    started = time.perf_counter()
+
+    # 추가한 청크의 (docstore ID, 원본 metadata 참조). FAISS는 metadata를 복사해 저장하므로
+    # 임베딩 뒤에 바뀐 metadata(중복 제거 시 합쳐진 페이지 등)를 저장 직전에 다시 반영
+    added_metadata: List[tuple] = []
+
+    def add_batch(batch: List[Document], vectors: List[List[float]], ids) -> None:
+        nonlocal vector_store
+        pairs = [(d.page_content, v) for d, v in zip(batch, vectors)]
+        metadatas = [d.metadata for d in batch]
+        if vector_store is None:
+            vector_store = FAISS.from_embeddings(
+                pairs, embeddings, metadatas=metadatas, ids=ids
+            )
+            added = list(vector_store.index_to_docstore_id.values())
+        else:
+            added = vector_store.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+        added_metadata.extend(zip(added, metadatas))
+
+    def sync_metadata() -> None:
+        for doc_id, md in added_metadata:
+            doc = vector_store.docstore.search(doc_id)
+            if isinstance(doc, Document) and doc.metadata != md:
+                doc.metadata = dict(md)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        pending = []  # (batch, batch_hash, ids, future) — 제출 순서대로 인덱스에 추가
+
+        def drain(limit: int) -> None:
+            nonlocal chunks, embedded
+            while len(pending) > limit:
+                batch, bhash, ids, fut = pending.pop(0)
+                add_batch(batch, fut.result(), ids)
+                done_hashes.append(bhash)
+                chunks += len(batch)
+                embedded += len(batch)
+                if progress:
+                    progress(chunks)
+                if len(done_hashes) % CHECKPOINT_EVERY == 0:
+                    _save_checkpoint(
+                        index_dir, ckpt_key, vector_store, done_hashes, base_total, base
+                    )
+
+        for batch in _batched(documents, batch_size):
+            ids = None
+            if content_hash is not None:
+                ids = [
+                    chunk_id(source or "", content_hash, len(new_ids) + i)
+                    for i in range(len(batch))
+                ]
+                for doc, doc_id in zip(batch, ids):
+                    doc.metadata["chunk_id"] = doc_id
+                new_ids.extend(ids)
+                new_hashes.extend(d.metadata.get("chunk_hash", "") for d in batch)
+            bhash = _batch_hash(batch)
+            n_batches += 1
+            if n_batches <= len(done_hashes):
+                # 이전 실행에서 이미 인덱스에 들어간 배치는 건너뜀
+                if done_hashes[n_batches - 1] == bhash:
+                    resumed += 1
+                    chunks += len(batch)
+                    continue
+                # 입력이 달라졌으면 일치하는 앞부분만 남기고 체크포인트를 버림
+                stale = [
+                    vector_store.index_to_docstore_id[i]
+                    for i in range(base_total + chunks, vector_store.index.ntotal)
+                ]
+                if stale:
+                    vector_store.delete(stale)
+                del done_hashes[n_batches - 1 :]
+            texts = [d.page_content for d in batch]
+            pending.append(
+                (batch, bhash, ids, pool.submit(_embed_with_retry, embeddings, texts))
+            )
+            drain(max(1, concurrency) * 2)
+        drain(0)
+
+    if vector_store is None:
+        raise ValueError("임베딩할 문서가 없습니다.")
+
+    sync_metadata()
+    if index_type != "flat":
+        vector_store.index = build_ann_index(index_vectors(vector_store.index), index_type)
+    save_vector_store(vector_store, index_dir)
+    if source is not None:
+        record_source(
+            manifest,
+            source,
+            content_hash or "",
+            new_ids or list(vector_store.index_to_docstore_id.values())[base_total:],
+            chunk_hashes=new_hashes if new_ids and all(new_hashes) else None,
+            shared_hashes=shared_hashes,
+        )
+    if source is not None or not incremental:
+        save_manifest(index_dir, manifest)
+    _clear_checkpoint(index_dir, ckpt_key)
 
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL_NAME)
-    vector_store = FAISS.from_documents(documents, embedding=embeddings)
-    vector_store.save_local(index_dir)
+    elapsed = time.perf_counter() - started
+    stats = {
+        "chunks": chunks,
+        "batches": n_batches,
+        "resumed_batches": resumed,
+        "removed": removed,
+        "total": vector_store.index.ntotal,
+        "index_type": index_type_of(vector_store.index),
+        "seconds": round(elapsed, 3),
+        "embedded": embedded,
+        "chunks_per_sec": round(embedded / elapsed, 2) if elapsed > 0 else None,
+    }
+    logger.info("[Embed] %s: %s", index_dir, stats)
+    return stats
 
 
-def load_vector_store(index_dir: str = None) -> FAISS:
+def load_vector_store(index_dir: str = None, lazy: bool = True) -> FAISS:
     """
     index_dir: FAISS 인덱스가 저장된 경로. None이면 기본(data/faiss_index) 사용
+    lazy: compact 형식(docstore.sqlite)일 때 벡터는 mmap, 청크는 필요할 때만 읽음.
+          인덱스를 수정할 때는 False (전부 메모리로 로드)
+    이전 pickle 형식(index.pkl)은 그대로 읽고, 다음 학습 때 compact 형식으로 다시 저장됩니다.
     """
     if index_dir is None:
         index_dir = os.path.join(os.path.dirname(__file__), "../data/faiss_index")
 
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL_NAME)
+    embeddings = get_embeddings()
+    if has_compact_store(index_dir):
+        try:
+            return load_compact_store(index_dir, embeddings, lazy=lazy)
+        except IndexMismatchError as e:
+            # docstore를 연 직후 재학습이 그 세대의 벡터 파일을 지움 → 새 docstore로 한 번 더
+            logger.info("%s, 다시 로드합니다.", e)
+            time.sleep(0.05)
+            return load_compact_store(index_dir, embeddings, lazy=lazy)
     db = FAISS.load_local(
         index_dir,
         embeddings,
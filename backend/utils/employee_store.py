@@ -0,0 +1,148 @@
+# backend/utils/employee_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# data/는 /static으로 공개되므로 사번 DB는 별도 폴더에 둠
+EMPLOYEE_DB_PATH = os.getenv(
+    "EMPLOYEE_DB_PATH", os.path.join(os.path.dirname(__file__), "../db/employees.sqlite")
+)
+
+PartKey = Tuple[str, str, str]
+
+
+class EmployeeStore:
+    """
+    (company, team, part, employeeID) 유일 인덱스를 가진 SQLite 사번 저장소.
+    - exists/add는 인덱스 조회 한 번 (파일 전체 읽기/쓰기 없음)
+    - add_many는 한 트랜잭션으로 원자적으로 삽입
+    - 동시 요청은 SQLite 잠금(+ busy_timeout)으로 직렬화되어 쓰기가 유실되지 않음
+    """
+
+    def __init__(self, path: str = EMPLOYEE_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS employees ("
+                " company TEXT NOT NULL, team TEXT NOT NULL, part TEXT NOT NULL,"
+                " employee_id TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_employees"
+                " ON employees (company, team, part, employee_id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def exists(self, company: str, team: str, part: str, employee_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM employees WHERE company=? AND team=? AND part=? AND employee_id=?",
+                (company, team, part, employee_id),
+            ).fetchone()
+        return row is not None
+
+    def add(self, company: str, team: str, part: str, employee_id: str) -> bool:
+        """새로 추가되었으면 True, 이미 있으면 False"""
+        return self.add_many([(company, team, part, employee_id)]) == 1
+
+    def add_many(self, rows: Iterable[Tuple[str, str, str, str]]) -> int:
+        """여러 사번을 한 트랜잭션으로 추가하고, 실제로 추가된 개수를 반환"""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO employees"
+                    " (company, team, part, employee_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(c, t, p, e, now) for c, t, p, e in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def list_part(self, company: str, team: str, part: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT employee_id FROM employees WHERE company=? AND team=? AND part=?"
+                " ORDER BY rowid",
+                (company, team, part),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def all_parts(self) -> Dict[PartKey, List[str]]:
+        """파트별 사번 목록 전체 (로그인 트리 생성용, 쿼리 한 번)"""
+        result: Dict[PartKey, List[str]] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT company, team, part, employee_id FROM employees ORDER BY rowid"
+            ).fetchall()
+        for c, t, p, e in rows:
+            result.setdefault((c, t, p), []).append(e)
+        return result
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def migrate_from_json(self, data_dir: str) -> int:
+        """
+        data/<company>/<team>/<part>/employees.json을 한 번만 가져옵니다.
+        이미 가져왔으면 아무것도 하지 않고 0을 반환합니다.
+        """
+        if self._meta("json_migrated"):
+            return 0
+        rows: List[Tuple[str, str, str, str]] = []
+        for comp in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+            comp_dir = os.path.join(data_dir, comp)
+            if not os.path.isdir(comp_dir):
+                continue
+            for team in sorted(os.listdir(comp_dir)):
+                team_dir = os.path.join(comp_dir, team)
+                if not os.path.isdir(team_dir):
+                    continue
+                for part in sorted(os.listdir(team_dir)):
+                    emp_file = os.path.join(team_dir, part, "employees.json")
+                    if not os.path.isfile(emp_file):
+                        continue
+                    try:
+                        with open(emp_file, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                    except (json.JSONDecodeError, IOError):
+                        continue
+                    if isinstance(data, list):
+                        rows.extend((comp, team, part, str(e)) for e in data)
+        added = self.add_many(rows)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (str(int(time.time())),),
+            )
+        print(f"[Employees] employees.json에서 {added}명 이전 완료")
+        return added
+
+
+_employee_store: Optional[EmployeeStore] = None
+_employee_store_lock = threading.Lock()
+
+
+def get_employee_store() -> EmployeeStore:
+    global _employee_store
+    with _employee_store_lock:
+        if _employee_store is None:
+            _employee_store = EmployeeStore()
+        return _employee_store
@@ -0,0 +1,102 @@
+# backend/utils/federated.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from utils.compact_store import has_vector_index
+from utils.embedding import get_embeddings
+from utils.store_cache import get_vector_store
+
+# 여러 챗봇 인덱스에 동시에 질의할 때 사용하는 스레드 수
+FEDERATED_WORKERS = int(os.getenv("FEDERATED_WORKERS", "8"))
+_federated_pool = ThreadPoolExecutor(max_workers=FEDERATED_WORKERS, thread_name_prefix="fed")
+
+# data/<company>/<team>/<part>/<bot>/faiss_index
+_SCOPE_DEPTH = 4
+
+
+def _subdirs(path: str) -> List[str]:
+    try:
+        return [e.name for e in os.scandir(path) if e.is_dir()]
+    except OSError:
+        return []
+
+
+def find_indexes(data_dir: str, scope: List[str]) -> List[Tuple[List[str], str]]:
+    """
+    scope([company] / [company, team] / [company, team, part]) 아래의
+    모든 챗봇 faiss_index를 ([company, team, part, bot], index_dir) 목록으로 반환
+    """
+    found: List[Tuple[List[str], str]] = []
+
+    def walk(path: str, names: List[str]) -> None:
+        if len(names) == _SCOPE_DEPTH:
+            index_dir = os.path.join(path, "faiss_index")
+            if has_vector_index(index_dir):
+                found.append((names, index_dir))
+            return
+        for name in sorted(_subdirs(path)):
+            walk(os.path.join(path, name), names + [name])
+
+    walk(os.path.join(data_dir, *scope), list(scope))
+    return found
+
+
+def _search_one(
+    names: List[str], index_dir: str, query_vec: np.ndarray, k: int
+) -> List[Dict[str, Any]]:
+    # 인덱스 핸들은 store_cache의 LRU를 공유하므로 팬아웃마다 다시 로드하지 않음
+    db = get_vector_store(index_dir)
+    distances, idx = db.index.search(query_vec, k)
+    company, team, part, bot = names
+    hits: List[Dict[str, Any]] = []
+    for dist, pos in zip(distances[0], idx[0]):
+        if pos == -1:
+            continue
+        doc = db.docstore.search(db.index_to_docstore_id[pos])
+        md = getattr(doc, "metadata", None) or {}
+        hits.append(
+            {
+                "company": company,
+                "team": team,
+                "part": part,
+                "chatbot_name": bot,
+                "pdf_name": md.get("pdf_name", "UnknownPDF"),
+                "page": md.get("page"),
+                "text": getattr(doc, "page_content", ""),
+                "score": float(dist),
+            }
+        )
+    return hits
+
+
+def federated_search(
+    data_dir: str, scope: List[str], question: str, top_k: int = 5
+) -> Dict[str, Any]:
+    """
+    질의를 한 번만 임베딩한 뒤 scope 아래 모든 챗봇 인덱스에 병렬로 검색하고,
+    L2 거리(작을수록 가까움) 기준으로 합쳐 상위 top_k개를 반환합니다.
+    """
+    indexes = find_indexes(data_dir, scope)
+    if not indexes:
+        return {"searched": 0, "failed": [], "sources": []}
+
+    query_vec = np.asarray([get_embeddings().embed_query(question)], dtype="float32")
+    futures = [
+        (names, _federated_pool.submit(_search_one, names, index_dir, query_vec, top_k))
+        for names, index_dir in indexes
+    ]
+
+    hits: List[Dict[str, Any]] = []
+    failed: List[str] = []
+    for names, fut in futures:
+        try:
+            hits.extend(fut.result())
+        except Exception as e:
+            print(f"[Search] {'/'.join(names)} 검색 실패: {e!r}")
+            failed.append("/".join(names))
+
+    hits.sort(key=lambda h: h["score"])
+    return {"searched": len(indexes), "failed": failed, "sources": hits[:top_k]}
@@ -0,0 +1,239 @@
+# backend/utils/history.py
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+
+from utils.tokens import count_tokens, truncate_tokens
+from utils.llm_usage import TokenUsageCollector, callback_config
+
+# 프롬프트에 그대로 넣을 최근 대화의 최대 토큰 수 / 메시지 수
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "600"))
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "6"))
+# 그보다 오래된 대화를 요약한 문장의 최대 토큰 수
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+# 세션별 요약 캐시 크기 / 유지 시간(초)
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(6 * 3600)))
+# 대화 기록이 있을 때 후속 질문을 독립적인 검색 질의로 다시 쓸지 여부
+QUERY_REWRITE = os.getenv("QUERY_REWRITE", "1") == "1"
+
+SUMMARY_PROMPT = """
+    다음은 사용자와 매뉴얼 챗봇의 이전 대화 요약과 그 뒤에 이어진 대화입니다.
+    이후 질문에 답할 때 필요한 사실(장비, 메뉴, 오류 코드, 진행 중인 작업 단계 등)만 남겨
+    한국어로 5문장 이내로 다시 요약해줘. 요약만 출력해.
+
+    이전 요약: {summary}
+
+    이어진 대화:
+    {dialog}
+
+    요약:"""
+
+REWRITE_PROMPT = """
+    아래 대화 기록을 참고해서 마지막 질문을 대화 기록 없이도 이해할 수 있는
+    하나의 검색 질의로 다시 써줘. 지시어(그것, 그 다음 등)는 구체적인 대상으로 바꾸고,
+    질의만 한 줄로 출력해.
+
+    {history}
+    마지막 질문: {question}
+
+    검색 질의:"""
+
+
+def _normalize(chat_history: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    messages: List[Dict[str, str]] = []
+    for msg in chat_history or []:
+        content = (msg.get("content") or "").strip()
+        if content:
+            role = "user" if msg.get("role") == "user" else "assistant"
+            messages.append({"role": role, "content": content})
+    return messages
+
+
+def _render(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(
+        f"{'사용자' if m['role'] == 'user' else '챗봇'}: {m['content']}" for m in messages
+    )
+
+
+def _fingerprint(messages: List[Dict[str, str]]) -> str:
+    h = hashlib.sha1()
+    for m in messages:
+        h.update(f"{m['role']}\0{m['content']}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def split_history(messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """(요약할 오래된 메시지, 그대로 넣을 최근 메시지)로 나눔"""
+    used, start = 0, len(messages)
+    while start > 0 and len(messages) - start < HISTORY_MAX_MESSAGES:
+        cost = count_tokens(messages[start - 1]["content"]) + 4
+        if used + cost > HISTORY_TOKEN_BUDGET:
+            break
+        used += cost
+        start -= 1
+    return messages[:start], messages[start:]
+
+
+class SessionSummaries:
+    """
+    session_id별로 "앞에서부터 n개 메시지를 요약한 결과"를 보관하는 LRU.
+    다음 턴에는 새로 밀려난 메시지만 이전 요약에 접어 넣으므로(rolling)
+    대화가 길어져도 요약 비용과 프롬프트 크기가 일정합니다.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_CACHE_MAX, ttl: float = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or time.time() - entry["at"] > self.ttl:
+                self._entries.pop(session_id, None)
+                return None
+            self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id: str, upto: int, fingerprint: str, summary: str) -> None:
+        with self._lock:
+            self._entries[session_id] = {
+                "upto": upto,
+                "fingerprint": fingerprint,
+                "summary": summary,
+                "at": time.time(),
+            }
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_summaries = SessionSummaries()
+
+
+def _summarize(
+    previous: str, messages: List[Dict[str, str]], usage: Optional[TokenUsageCollector] = None
+) -> str:
+    # 순환 import를 피하기 위해 호출 시점에 가져옴
+    from utils.rag import get_llm
+
+    chain = PromptTemplate.from_template(SUMMARY_PROMPT) | get_llm(temperature=0) | StrOutputParser()
+    summary = chain.invoke(
+        {"summary": previous or "(없음)", "dialog": _render(messages)}, config=callback_config(usage)
+    )
+    return truncate_tokens(summary.strip(), HISTORY_SUMMARY_TOKENS)
+
+
+def summarize_older(
+    session_id: Optional[str],
+    older: List[Dict[str, str]],
+    usage: Optional[TokenUsageCollector] = None,
+) -> str:
+    """
+    오래된 메시지의 요약을 반환합니다.
+    같은 세션에서 이미 요약한 앞부분이 그대로면 새로 밀려난 메시지만 접어 넣습니다.
+    session_id가 없으면 요약하지 않고 오래된 메시지를 버립니다.
+    usage: 요약 호출의 토큰 사용량을 더할 수집기
+    """
+    if not older or not session_id:
+        return ""
+    cached = _summaries.get(session_id)
+    if cached and cached["upto"] <= len(older) and cached["fingerprint"] == _fingerprint(
+        older[: cached["upto"]]
+    ):
+        _summaries.record_hit()
+        if cached["upto"] == len(older):
+            return cached["summary"]
+        previous, new = cached["summary"], older[cached["upto"]:]
+    else:
+        _summaries.record_miss()
+        previous, new = "", older
+    try:
+        summary = _summarize(previous, new, usage)
+    except Exception as e:
+        print(f"[History] 대화 요약 실패, 이전 요약 유지: {e!r}")
+        return previous
+    _summaries.put(session_id, len(older), _fingerprint(older), summary)
+    return summary
+
+
+def format_history(summary: str, recent: List[Dict[str, str]]) -> str:
+    """RAG 프롬프트에 넣을 대화 블록 (대화가 없으면 빈 문자열)"""
+    blocks = []
+    if summary:
+        blocks.append(f"이전 대화 요약: {summary}")
+    if recent:
+        blocks.append("최근 대화:\n" + _render(recent))
+    return "\n".join(blocks) + "\n\n" if blocks else ""
+
+
+def rewrite_query(
+    question: str, history_block: str, usage: Optional[TokenUsageCollector] = None
+) -> str:
+    """대화 맥락을 반영한 독립 검색 질의 (실패하거나 대화가 없으면 원래 질문)"""
+    if not history_block or not QUERY_REWRITE:
+        return question
+    from utils.rag import get_llm
+
+    chain = PromptTemplate.from_template(REWRITE_PROMPT) | get_llm(temperature=0) | StrOutputParser()
+    try:
+        rewritten = chain.invoke(
+            {"history": history_block, "question": question}, config=callback_config(usage)
+        ).strip()
+    except Exception as e:
+        print(f"[History] 질의 재작성 실패, 원래 질문 사용: {e!r}")
+        return question
+    # 여러 줄이 오면 첫 줄만, 지나치게 길면 원래 질문을 사용
+    rewritten = rewritten.splitlines()[0].strip() if rewritten else ""
+    if not rewritten or count_tokens(rewritten) > 4 * count_tokens(question) + 64:
+        return question
+    return rewritten
+
+
+def prepare_conversation(
+    question: str,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[str] = None,
+    usage: Optional[TokenUsageCollector] = None,
+) -> Dict[str, str]:
+    """
+    1) 최근 대화는 토큰 예산 안에서 그대로, 그 이전은 세션별 롤링 요약으로
+    2) 대화가 있으면 후속 질문을 검색용 독립 질의로 재작성
+    반환: {"query": 검색/캐시에 쓸 질의, "history": 프롬프트용 대화 블록}
+    usage: 요약/재작성 LLM 호출의 토큰 사용량을 더할 수집기
+    """
+    messages = _normalize(chat_history)
+    # 프론트엔드가 방금 보낸 질문을 기록 끝에 포함해 보내는 경우 중복 제거
+    if messages and messages[-1]["role"] == "user" and messages[-1]["content"] == question.strip():
+        messages = messages[:-1]
+    if not messages:
+        return {"query": question, "history": ""}
+    older, recent = split_history(messages)
+    history_block = format_history(summarize_older(session_id, older, usage), recent)
+    return {"query": rewrite_query(question, history_block, usage), "history": history_block}
+
+
+def session_cache_stats() -> Dict[str, Any]:
+    return _summaries.stats()
@@ -0,0 +1,150 @@
+# backend/utils/index_manifest.py
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils.compact_store import has_vector_index
+
+# faiss_index/ 안에 인덱스와 함께 저장되는 매니페스트 파일
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(source: str, content_hash: str, ordinal: int) -> str:
+    """
+    PDF 파일명 + 내용 해시 + 청크 순번으로 만든 안정적인 청크 ID.
+    같은 내용의 PDF가 다른 이름으로 올라와도 ID가 겹치지 않도록 파일명도 포함합니다.
+    """
+    prefix = hashlib.sha1(f"{source}\0{content_hash}".encode("utf-8")).hexdigest()[:16]
+    return f"{prefix}-{ordinal:06d}"
+
+
+def load_manifest(index_dir: str) -> Dict[str, Any]:
+    """
+    {"sources": {파일명: {"sha256", "chunk_ids", "chunks", "indexed_at"}}} 형태.
+    파일이 없거나 깨졌으면 빈 매니페스트를 반환합니다.
+    """
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return {"sources": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.setdefault("sources", {})
+        return data
+    except (json.JSONDecodeError, IOError):
+        return {"sources": {}}
+
+
+def save_manifest(index_dir: str, manifest: Dict[str, Any]) -> None:
+    """임시 파일에 쓴 뒤 교체하여 원자적으로 저장"""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def is_indexed(index_dir: str, source: str, content_hash: str) -> bool:
+    """같은 이름·같은 내용의 PDF가 이미 인덱스에 들어 있는지"""
+    entry = load_manifest(index_dir)["sources"].get(source)
+    return bool(entry) and entry.get("sha256") == content_hash and has_vector_index(index_dir)
+
+
+def find_source_by_hash(index_dir: str, content_hash: str) -> Optional[str]:
+    """같은 내용(sha256)의 PDF가 이미 인덱스에 있으면 그 파일명을 반환 (이름은 달라도 됨)"""
+    if not has_vector_index(index_dir):
+        return None
+    for source, entry in load_manifest(index_dir)["sources"].items():
+        if entry.get("sha256") == content_hash:
+            return source
+    return None
+
+
+def record_source(
+    manifest: Dict[str, Any],
+    source: str,
+    content_hash: str,
+    chunk_ids: List[str],
+    chunk_hashes: Optional[List[str]] = None,
+    shared_hashes: Optional[Dict[str, List[int]]] = None,
+) -> None:
+    """
+    chunk_hashes: chunk_ids와 같은 순서의 청크 해시 (다음 업로드의 중복 판정용)
+    shared_hashes: 다른 PDF가 이미 저장하고 있어 이 PDF가 다시 저장하지 않은 청크 해시와
+                   그 청크가 이 PDF에서 나온 페이지 목록
+    """
+    entry = {
+        "sha256": content_hash,
+        "chunk_ids": chunk_ids,
+        "chunks": len(chunk_ids),
+        "indexed_at": int(time.time() * 1000),
+    }
+    if chunk_hashes is not None and len(chunk_hashes) == len(chunk_ids):
+        entry["chunk_hashes"] = chunk_hashes
+        entry["shared_hashes"] = sorted(shared_hashes or ())
+        entry["shared_pages"] = {h: pages for h, pages in (shared_hashes or {}).items() if pages}
+    manifest["sources"][source] = entry
+
+
+def indexed_chunk_hashes(manifest: Dict[str, Any], exclude: Optional[str] = None) -> Set[str]:
+    """인덱스에 저장된 청크 해시 (exclude PDF가 소유한 청크는 곧 교체되므로 제외)"""
+    hashes: Set[str] = set()
+    for source, entry in manifest["sources"].items():
+        if source != exclude:
+            hashes.update(entry.get("chunk_hashes", ()))
+    return hashes
+
+
+def release_source(
+    manifest: Dict[str, Any], source: str
+) -> Optional[Tuple[List[str], Dict[str, Dict[str, Any]]]]:
+    """
+    source를 교체/삭제할 때 (인덱스에서 지울 청크 ID 목록, 다른 PDF로 넘긴 청크)를 반환합니다.
+    다른 PDF가 공유하던 청크는 지우지 않고 그 PDF 소유로 넘기며, 넘긴 청크는
+    {청크 ID: {"pdf_name": 새 소유 PDF, "pages": 그 PDF에서의 페이지 목록(모르면 None)}}로 알려
+    docstore의 출처 metadata를 고칠 수 있게 합니다.
+    매니페스트에 없는 source면 None.
+    """
+    entry = manifest["sources"].get(source)
+    if not entry:
+        return None
+    ids = list(entry.get("chunk_ids", []))
+    hashes = entry.get("chunk_hashes")
+    if not hashes or len(hashes) != len(ids):
+        return ids, {}
+    to_delete: List[str] = []
+    handed_over: Dict[str, Dict[str, Any]] = {}
+    for doc_id, h in zip(ids, hashes):
+        heir_name, heir = next(
+            (
+                (name, other)
+                for name, other in manifest["sources"].items()
+                if name != source and h in other.get("shared_hashes", ())
+            ),
+            (None, None),
+        )
+        if heir is None:
+            to_delete.append(doc_id)
+            continue
+        heir["shared_hashes"].remove(h)
+        heir["chunk_ids"].append(doc_id)
+        heir["chunk_hashes"].append(h)
+        heir["chunks"] = len(heir["chunk_ids"])
+        pages = heir.get("shared_pages", {}).pop(h, None)
+        handed_over[doc_id] = {"pdf_name": heir_name, "pages": pages}
+    return to_delete, handed_over
+
+
+def source_chunk_ids(manifest: Dict[str, Any], source: str) -> Optional[List[str]]:
+    entry = manifest["sources"].get(source)
+    return list(entry.get("chunk_ids", [])) if entry else None
@@ -0,0 +1,153 @@
+# backend/utils/jobs.py
+import os
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+# 인제스트 워커 수와 대기열 길이 (실행 중 + 대기 중 작업이 이 합을 넘으면 거절)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "8"))
+# 완료된 작업 기록을 최대 몇 개까지 보관할지
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """작업 함수 안에서 취소 요청을 감지했을 때 발생"""
+
+
+class QueueFull(Exception):
+    """대기열이 가득 차 새 작업을 받을 수 없을 때 발생"""
+
+
+class Job:
+    def __init__(self, kind: str, meta: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.stages: Dict[str, Dict[str, Any]] = OrderedDict()
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        """단계별 진행률 갱신. 취소 요청이 있으면 JobCancelled를 발생시킵니다."""
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"done": 0, "total": None})
+            entry["done"] = done
+            if total is not None:
+                entry["total"] = total
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "meta": self.meta,
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "result": self.result,
+                "error": self.error,
+                "createdAt": int(self.created_at * 1000),
+                "startedAt": int(self.started_at * 1000) if self.started_at else None,
+                "finishedAt": int(self.finished_at * 1000) if self.finished_at else None,
+            }
+
+
+class JobManager:
+    """
+    작은 스레드 풀 위에서 오래 걸리는 작업(PDF 파싱/인덱싱)을 실행합니다.
+    대기열은 max_workers + max_queue개로 제한됩니다.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE):
+        self.capacity = max_workers + max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(
+        self, kind: str, fn: Callable[..., Any], *args, meta: Optional[Dict[str, Any]] = None
+    ) -> Job:
+        """fn(job, *args)를 백그라운드에서 실행할 작업으로 등록"""
+        job = Job(kind, meta)
+        with self._lock:
+            if self._active >= self.capacity:
+                raise QueueFull()
+            self._active += 1
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        with job._lock:
+            # 아직 시작 전이면 바로 취소 처리
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args) -> None:
+        try:
+            with job._lock:
+                if job.status == CANCELLED:
+                    return
+                job.status = RUNNING
+                job.started_at = time.time()
+            result = fn(job, *args)
+            status, error = SUCCEEDED, None
+        except JobCancelled:
+            result, status, error = None, CANCELLED, None
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, FAILED, str(e) or e.__class__.__name__
+        finally:
+            with self._lock:
+                self._active -= 1
+        with job._lock:
+            job.result = result
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED]
+        for jid in finished[: max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[jid]
+
+
+_job_manager = JobManager()
+
+
+def get_job_manager() -> JobManager:
+    return _job_manager
@@ -0,0 +1,216 @@
+# backend/utils/lexical.py
+import os
+import re
+import json
+import math
+import shutil
+import tempfile
+import threading
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from utils.store_cache import index_signature
+
+# faiss_index/ 옆에 만들어지는 어휘(BM25) 인덱스 폴더 이름
+LEXICAL_DIR = "bm25_index"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 역순위 결합(RRF) 상수
+RRF_K = 60
+
+# 영문/숫자 토큰: 부품번호·에러코드(E-1023, HI5A-T30 등)를 하나로 유지
+_ALNUM_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_HANGUL_RE = re.compile(r"[가-힣]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어 친화 토크나이저 (외부 형태소 분석기 없이 동작).
+    - 영문/숫자: 구분자를 포함한 전체 토큰 + 구분자로 나눈 조각
+    - 한글: 어절 전체 + 음절 bigram (조사가 붙은 어절도 어간 bigram으로 매칭)
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: List[str] = []
+    for m in _ALNUM_RE.finditer(text):
+        tok = m.group()
+        tokens.append(tok)
+        parts = re.split(r"[-_./]", tok)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    for m in _HANGUL_RE.finditer(text):
+        word = m.group()
+        tokens.append(word)
+        if len(word) > 2:
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def lexical_dir_for(index_dir: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(index_dir)), LEXICAL_DIR)
+
+
+# bm25_index/ 경로별 락: 폴더 교체와 (이전 챗봇의) 첫 질의 시 생성을 한 번에 하나씩
+_build_locks: Dict[str, threading.RLock] = {}
+_build_locks_guard = threading.Lock()
+
+
+def _build_lock(path: str) -> threading.RLock:
+    with _build_locks_guard:
+        lock = _build_locks.get(path)
+        if lock is None:
+            lock = _build_locks[path] = threading.RLock()
+        return lock
+
+
+def build_lexical_index(index_dir: str, store: FAISS) -> Dict[str, Any]:
+    """
+    store의 docstore 청크로 BM25 역색인을 만들어 faiss_index/ 옆 bm25_index/에 저장합니다.
+    CSR 형태의 numpy 배열(.npy)로 저장하므로 조회 시 mmap으로 바로 열 수 있습니다.
+    - vocab.json: 토큰 → 토큰 번호
+    - offsets.npy: 토큰별 posting 시작 위치 (int64, 토큰 수 + 1)
+    - postings.npy / tfs.npy: 문서 위치(int32) / 출현 빈도(float32)
+    - doc_len.npy: 문서 길이(int32),  ids.json: 문서 위치 → docstore ID
+    """
+    doc_ids: List[str] = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+    vocab: Dict[str, int] = {}
+    term_docs: List[List[Tuple[int, int]]] = []
+    doc_len = np.zeros(len(doc_ids), dtype="int32")
+
+    for pos, doc_id in enumerate(doc_ids):
+        doc = store.docstore.search(doc_id)
+        counts = Counter(tokenize(getattr(doc, "page_content", "") or ""))
+        doc_len[pos] = sum(counts.values())
+        for term, tf in counts.items():
+            tid = vocab.get(term)
+            if tid is None:
+                tid = vocab[term] = len(term_docs)
+                term_docs.append([])
+            term_docs[tid].append((pos, tf))
+
+    offsets = np.zeros(len(term_docs) + 1, dtype="int64")
+    for tid, plist in enumerate(term_docs):
+        offsets[tid + 1] = offsets[tid] + len(plist)
+    postings = np.empty(int(offsets[-1]), dtype="int32")
+    tfs = np.empty(int(offsets[-1]), dtype="float32")
+    for tid, plist in enumerate(term_docs):
+        start = offsets[tid]
+        for j, (pos, tf) in enumerate(plist):
+            postings[start + j] = pos
+            tfs[start + j] = tf
+
+    # 호출마다 다른 임시 폴더에 다 쓴 뒤 교체 (동시에 만들어도 서로의 파일을 지우지 않음)
+    target = lexical_dir_for(index_dir)
+    tmp = tempfile.mkdtemp(prefix=LEXICAL_DIR + ".", suffix=".tmp", dir=os.path.dirname(target))
+    try:
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "postings.npy"), postings)
+        np.save(os.path.join(tmp, "tfs.npy"), tfs)
+        np.save(os.path.join(tmp, "doc_len.npy"), doc_len)
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(vocab, f, ensure_ascii=False)
+        with open(os.path.join(tmp, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(doc_ids, f)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    with _build_lock(target):
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    return {"docs": len(doc_ids), "terms": len(vocab), "postings": int(offsets[-1])}
+
+
+class LexicalIndex:
+    """bm25_index/를 mmap으로 열어 BM25 점수로 검색"""
+
+    def __init__(self, path: str):
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.offsets = load("offsets.npy")
+        self.postings = load("postings.npy")
+        self.tfs = load("tfs.npy")
+        self.doc_len = load("doc_len.npy")
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab: Dict[str, int] = json.load(f)
+        with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as f:
+            self.ids: List[str] = json.load(f)
+        self.n_docs = len(self.ids)
+        self.avgdl = float(self.doc_len.mean()) if self.n_docs else 0.0
+        self._positions: Optional[Dict[str, int]] = None
+
+    def position(self, doc_id: str) -> Optional[int]:
+        """docstore ID의 문서 위치 (인덱스를 만들 당시의 FAISS 위치와 같음)"""
+        if self._positions is None:
+            self._positions = {doc_id: pos for pos, doc_id in enumerate(self.ids)}
+        return self._positions.get(doc_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        if not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype="float32")
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / max(self.avgdl, 1e-9))
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            start, end = int(self.offsets[tid]), int(self.offsets[tid + 1])
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end]
+            df = end - start
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        top = np.argsort(-scores)[:k]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+_lexical_cache: Dict[str, Tuple[Tuple[int, int], LexicalIndex]] = {}
+_lexical_lock = threading.Lock()
+
+
+def get_lexical_index(index_dir: str, store: Optional[FAISS] = None) -> Optional[LexicalIndex]:
+    """
+    bm25_index/를 (변경 시에만) 다시 열어 반환합니다.
+    인덱스가 없고 store가 주어지면 이전 챗봇을 위해 그 자리에서 만듭니다.
+    동시에 들어온 첫 질의들은 한 번만 만들고, 만들다 실패하면 None(→ dense 검색만 사용).
+    """
+    path = lexical_dir_for(index_dir)
+    if not os.path.isdir(path):
+        if store is None:
+            return None
+        with _build_lock(path):
+            if not os.path.isdir(path):
+                try:
+                    build_lexical_index(index_dir, store)
+                except Exception as e:
+                    print(f"[Lexical] {path} BM25 인덱스 생성 실패, dense 검색만 사용: {e!r}")
+                    return None
+    try:
+        signature = index_signature(path, data_only=False)
+    except FileNotFoundError:
+        # 재학습으로 폴더가 교체되는 중 → 이번 질의는 dense 검색만
+        return None
+    with _lexical_lock:
+        cached = _lexical_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    try:
+        index = LexicalIndex(path)
+    except (OSError, ValueError) as e:
+        print(f"[Lexical] {path} 열기 실패, dense 검색만 사용: {e!r}")
+        return None
+    with _lexical_lock:
+        _lexical_cache[path] = (signature, index)
+    return index
+
+
+def rrf_fuse(rankings: List[List[str]], k: int, rrf_k: int = RRF_K) -> List[str]:
+    """여러 순위 목록(docstore ID)을 역순위 결합으로 합쳐 상위 k개 ID 반환"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda d: scores[d], reverse=True)[:k]
@@ -0,0 +1,77 @@
+# backend/utils/llm_usage.py
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from utils.tokens import count_tokens
+
+
+class TokenUsageCollector(BaseCallbackHandler):
+    """
+    요청 한 건에서 일어난 모든 LLM 호출(대화 요약, 질의 재작성, 답변 생성)의 토큰 사용량을 합산하는 콜백.
+    모델 응답의 usage_metadata(없으면 llm_output["token_usage"])를 그대로 더하므로 제공자가 실제로
+    과금한 값입니다. estimate=True(가짜 LLM)일 때만 사용량이 없는 호출을 tiktoken으로 추정합니다.
+    체인 호출 시 config={"callbacks": [collector]}로 넘깁니다.
+    """
+
+    def __init__(self, estimate: bool = False):
+        self.estimate = estimate
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        self._prompts: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if self.estimate:
+            with self._lock:
+                self._prompts[run_id] = "\n".join(
+                    str(m.content) for batch in messages for m in batch
+                )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_text = self._prompts.pop(run_id, None) if self.estimate else None
+        prompt, completion, reported = 0, 0, False
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt += usage.get("input_tokens", 0)
+                    completion += usage.get("output_tokens", 0)
+                    reported = True
+        if not reported:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            if usage:
+                prompt = usage.get("prompt_tokens", 0)
+                completion = usage.get("completion_tokens", 0)
+                reported = True
+        if not reported and self.estimate:
+            prompt = count_tokens(prompt_text)
+            completion = sum(count_tokens(gen.text) for g in response.generations for gen in g)
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+            self.calls += 1
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._prompts.pop(run_id, None)
+
+    def usage(self, context_tokens: int = 0) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "context_tokens": context_tokens,
+                "llm_calls": self.calls,
+            }
+
+
+def callback_config(collector: Optional[TokenUsageCollector]) -> Dict[str, Any]:
+    """체인 invoke/stream에 넘길 config (collector가 없으면 빈 설정)"""
+    return {"callbacks": [collector]} if collector is not None else {}
@@ -0,0 +1,308 @@
+# backend/utils/mcq.py
+import re
+import os
+import json
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents.base import Document
+from langchain.prompts import PromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from pydantic import BaseModel
+from fastapi import HTTPException
+
+from utils.store_cache import get_vector_store
+from utils.embedding import get_embeddings
+from utils.rag import get_llm
+
+# LLM 호출 한 번에 만들 문항 수 / 컨텍스트로 넣을 청크 수
+MCQ_PER_BATCH = int(os.getenv("MCQ_PER_BATCH", "5"))
+MCQ_CHUNKS_PER_BATCH = int(os.getenv("MCQ_CHUNKS_PER_BATCH", "3"))
+# 동시에 진행할 LLM 호출 수
+MCQ_CONCURRENCY = int(os.getenv("MCQ_CONCURRENCY", "4"))
+# 기존/이번 문항과 코사인 유사도가 이 값 이상이면 중복으로 버림
+MCQ_DEDUP_THRESHOLD = float(os.getenv("MCQ_DEDUP_THRESHOLD", "0.92"))
+# 형식 오류로 모자란 문항만 다시 요청하는 최대 횟수 (배치별)
+MCQ_PARSE_RETRIES = int(os.getenv("MCQ_PARSE_RETRIES", "2"))
+# 중복 제거로 모자란 만큼 다시 생성하는 최대 라운드 수
+MCQ_MAX_ROUNDS = int(os.getenv("MCQ_MAX_ROUNDS", "3"))
+
+_mcq_executor = ThreadPoolExecutor(max_workers=MCQ_CONCURRENCY, thread_name_prefix="mcq")
+
+MCQ_PROMPT = """
+    다음 컨텍스트를 바탕으로 객관식 4지선다 문제 {n}개를 JSON 형식으로 생성하세요.
+    출력 형식 예시:
+    [  {{ "question": "예시 질문?", "choices": ["A","B","C","D"], "answerIndex": 2 }}  , … ]
+
+    컨텍스트:
+    {context}
+    """
+
+
+class MCQItem(BaseModel):
+    id: Optional[int] = None
+    question: str
+    choices: List[str]
+    answerIndex: int
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 1) 페이지 층화 샘플링
+# ─────────────────────────────────────────────────────────────────────────────
+def page_strata(db: FAISS) -> List[List[Document]]:
+    """docstore의 청크를 (PDF, 페이지)별로 묶어 문서 순서대로 반환"""
+    groups: Dict[Tuple[str, int], List[Document]] = {}
+    for doc_id in db.index_to_docstore_id.values():
+        doc = db.docstore.search(doc_id)
+        if not isinstance(doc, Document) or not doc.page_content.strip():
+            continue
+        md = doc.metadata or {}
+        key = (str(md.get("pdf_name", "")), int(md.get("page") or 0))
+        groups.setdefault(key, []).append(doc)
+    return [groups[k] for k in sorted(groups)]
+
+
+def sample_batches(
+    strata: Sequence[List[Document]],
+    n_batches: int,
+    chunks_per_batch: int = MCQ_CHUNKS_PER_BATCH,
+    rng: Optional[random.Random] = None,
+) -> List[List[Document]]:
+    """
+    페이지 목록을 n_batches * chunks_per_batch개의 연속 구간으로 나누고
+    구간마다 임의의 페이지에서 청크 하나를 뽑습니다.
+    배치 b는 b번째 구간 묶음을 받으므로 배치들이 문서 전체를 고르게 덮습니다.
+    """
+    rng = rng or random.Random()
+    if not strata or n_batches <= 0:
+        return []
+    slots = n_batches * chunks_per_batch
+    picks: List[Document] = []
+    for s in range(slots):
+        lo = s * len(strata) // slots
+        hi = max(lo + 1, (s + 1) * len(strata) // slots)
+        picks.append(rng.choice(strata[rng.randrange(lo, hi)]))
+    batches: List[List[Document]] = []
+    for b in range(n_batches):
+        seen, batch = set(), []
+        for doc in picks[b * chunks_per_batch:(b + 1) * chunks_per_batch]:
+            if id(doc) not in seen:
+                seen.add(id(doc))
+                batch.append(doc)
+        batches.append(batch)
+    return batches
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 2) 관대한 스트리밍 JSON 추출
+# ─────────────────────────────────────────────────────────────────────────────
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class MCQStreamParser:
+    """
+    LLM 출력 조각을 feed()로 받아, 닫힌 JSON 객체가 완성될 때마다 꺼냅니다.
+    - 코드 펜스/설명 문구 등 객체 바깥의 잡음은 무시
+    - 문자열 안의 중괄호와 이스케이프를 구분
+    - 마지막 객체가 잘렸으면 그 앞의 완전한 객체들만 살림
+    - {"questions": [...]}처럼 감싼 형태도 안쪽 객체를 꺼냄
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._starts: List[int] = []
+        self._pos = 0
+        self._in_str = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        found: List[Dict] = []
+        for ch in chunk:
+            self._buf.append(ch)
+            pos = self._pos
+            self._pos += 1
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = bool(self._starts)
+            elif ch == "{":
+                self._starts.append(pos)
+            elif ch == "}" and self._starts:
+                start = self._starts.pop()
+                obj = self._parse("".join(self._buf[start:pos + 1]))
+                if isinstance(obj, dict) and "question" in obj:
+                    found.append(obj)
+                if not self._starts:
+                    # 최상위 객체가 닫히면 버퍼를 비워 메모리를 일정하게 유지
+                    self._buf, self._pos = [], 0
+        return found
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict]:
+        for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+        return None
+
+
+def extract_mcq_objects(text: str) -> List[Dict]:
+    """응답 전체 문자열에서 완전한 MCQ 후보 객체를 모두 추출"""
+    return MCQStreamParser().feed(text)
+
+
+def validate_mcq(obj: Dict) -> Optional[MCQItem]:
+    """보기 4개, answerIndex가 0~3 정수인 문항만 MCQItem으로 변환 (아니면 None)"""
+    question = obj.get("question")
+    choices = obj.get("choices")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(choices, list) or len(choices) != 4:
+        return None
+    choices = [str(c).strip() for c in choices]
+    if not all(choices):
+        return None
+    # bool(True==1)이나 "2" 같은 문자열은 모델이 형식을 어긴 것이므로 재시도 대상
+    answer = obj.get("answerIndex")
+    if type(answer) is not int or not 0 <= answer < len(choices):
+        return None
+    return MCQItem(question=question.strip(), choices=choices, answerIndex=answer)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3) 배치 단위 LLM 호출
+# ─────────────────────────────────────────────────────────────────────────────
+def _request_mcqs(context: str, n: int) -> Tuple[List[MCQItem], int]:
+    """LLM 응답을 스트리밍으로 받으며 유효한 문항을 모음. (문항, 버린 객체 수)"""
+    chain = PromptTemplate.from_template(MCQ_PROMPT) | get_llm(temperature=0.7) | StrOutputParser()
+    parser = MCQStreamParser()
+    items: List[MCQItem] = []
+    rejected = 0
+    try:
+        for chunk in chain.stream({"context": context, "n": n}):
+            for obj in parser.feed(chunk):
+                item = validate_mcq(obj)
+                if item is None:
+                    rejected += 1
+                elif len(items) < n:
+                    items.append(item)
+    except Exception as e:
+        # 도중에 끊겨도 이미 완성된 문항은 살림
+        print(f"[MCQ] 응답 수신 중단 ({len(items)}개 회수): {e!r}")
+    return items, rejected
+
+
+def _generate_batch(docs: List[Document], n: int) -> List[MCQItem]:
+    """모자란 개수만큼만 최대 MCQ_PARSE_RETRIES번 다시 요청"""
+    context = "\n\n".join(doc.page_content for doc in docs)
+    items: List[MCQItem] = []
+    for attempt in range(1 + MCQ_PARSE_RETRIES):
+        want = n - len(items)
+        got, rejected = _request_mcqs(context, want)
+        items.extend(got)
+        if rejected or len(got) < want:
+            print(f"[MCQ] 시도 {attempt + 1}: {len(got)}개 회수, {rejected}개 형식 오류")
+        if len(items) >= n:
+            break
+    return items[:n]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 4) 임베딩 유사도 기반 중복 제거
+# ─────────────────────────────────────────────────────────────────────────────
+class QuestionDeduper:
+    """이미 받아들인 문항들의 정규화 임베딩을 쌓아 두고 새 문항과 비교"""
+
+    def __init__(self, existing: Sequence[str] = (), threshold: float = MCQ_DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._embeddings = get_embeddings()
+        self._vecs = np.zeros((0, 0), dtype="float32")
+        if existing:
+            self._vecs = self._embed(list(existing))
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vecs = np.asarray(self._embeddings.embed_documents(texts), dtype="float32")
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.maximum(norms, 1e-12)
+
+    def filter(self, items: List[MCQItem]) -> List[MCQItem]:
+        if not items:
+            return []
+        vecs = self._embed([q.question for q in items])
+        kept: List[MCQItem] = []
+        for item, vec in zip(items, vecs):
+            if len(self._vecs) and float(np.max(self._vecs @ vec)) >= self.threshold:
+                continue
+            self._vecs = vec[None, :] if not len(self._vecs) else np.vstack([self._vecs, vec])
+            kept.append(item)
+        return kept
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 5) 생성 엔진
+# ─────────────────────────────────────────────────────────────────────────────
+def iter_mc_questions(
+    index_dir: str,
+    n_questions: int = 5,
+    existing: Sequence[str] = (),
+    per_batch: int = MCQ_PER_BATCH,
+) -> Iterator[List[MCQItem]]:
+    """
+    문서 전체에서 페이지별로 층화 샘플링한 청크로 배치를 만들어 병렬로 생성하고,
+    기존 문항(existing)과 겹치지 않는 문항을 배치가 끝나는 대로 내보냅니다.
+    중복으로 모자라면 최대 MCQ_MAX_ROUNDS 라운드까지 다시 샘플링합니다.
+    """
+    db = get_vector_store(index_dir)
+    strata = page_strata(db)
+    if not strata:
+        raise HTTPException(status_code=404, detail="문제를 만들 문서 청크가 없습니다.")
+
+    deduper = QuestionDeduper(existing)
+    rng = random.Random()
+    produced, failures = 0, 0
+    for _ in range(MCQ_MAX_ROUNDS):
+        need = n_questions - produced
+        if need <= 0:
+            break
+        n_batches = math.ceil(need / per_batch)
+        futures = []
+        for b, docs in enumerate(sample_batches(strata, n_batches, rng=rng)):
+            n = min(per_batch, need - b * per_batch)
+            futures.append(_mcq_executor.submit(_generate_batch, docs, n))
+        for fut in as_completed(futures):
+            try:
+                items = fut.result()
+            except Exception as e:
+                items = []
+                print(f"[MCQ] 배치 생성 실패: {e!r}")
+            if not items:
+                failures += 1
+                continue
+            kept = deduper.filter(items)[: n_questions - produced]
+            if kept:
+                produced += len(kept)
+                yield kept
+
+    if produced == 0 and failures:
+        raise HTTPException(status_code=500, detail="MCQ 생성 실패 (유효한 문항을 얻지 못함)")
+
+
+def generate_mc_questions(
+    index_dir: str, n_questions: int = 5, existing: Sequence[str] = ()
+) -> List[MCQItem]:
+    """iter_mc_questions의 결과를 모두 모아 반환 (id는 호출 측에서 부여)"""
+    mcqs: List[MCQItem] = []
+    for batch in iter_mc_questions(index_dir, n_questions, existing):
+        mcqs.extend(batch)
+    return mcqs
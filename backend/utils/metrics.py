@@ -0,0 +1,76 @@
+# backend/utils/metrics.py
+import threading
+from collections import deque
+from typing import Dict, Any
+
+# 엔드포인트별로 최근 N개의 지연시간(초)만 보관
+DEFAULT_WINDOW = 1000
+
+
+class LatencyRecorder:
+    """
+    최근 window개 샘플로 p50/p99를 계산하는 간단한 지연시간 기록기.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+        if not samples:
+            return {"count": count, "p50_ms": None, "p99_ms": None}
+
+        def pct(p: float) -> float:
+            idx = min(len(samples) - 1, int(round(p * (len(samples) - 1))))
+            return round(samples[idx] * 1000, 2)
+
+        return {"count": count, "p50_ms": pct(0.50), "p99_ms": pct(0.99)}
+
+
+_recorders: Dict[str, LatencyRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def get_recorder(name: str) -> LatencyRecorder:
+    with _recorders_lock:
+        rec = _recorders.get(name)
+        if rec is None:
+            rec = _recorders[name] = LatencyRecorder()
+        return rec
+
+
+def latency_snapshot() -> Dict[str, Any]:
+    with _recorders_lock:
+        names = list(_recorders)
+    return {name: get_recorder(name).snapshot() for name in names}
+
+
+# LLM 토큰 사용량 누적 (프롬프트/응답/컨텍스트)
+_token_totals: Dict[str, int] = {"requests": 0}
+_token_lock = threading.Lock()
+
+
+def record_token_usage(usage: Dict[str, int]) -> None:
+    with _token_lock:
+        _token_totals["requests"] += 1
+        for key, value in usage.items():
+            _token_totals[key] = _token_totals.get(key, 0) + int(value)
+
+
+def token_usage_snapshot() -> Dict[str, Any]:
+    with _token_lock:
+        totals = dict(_token_totals)
+    n = totals["requests"]
+    if n:
+        for key in [k for k in totals if k.endswith("_tokens")]:
+            totals["avg_" + key] = round(totals[key] / n, 1)
+    return totals
@@ -0,0 +1,137 @@
+# backend/utils/org_tree.py
+import os
+import json
+import hashlib
+import threading
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+
+class OrgTree:
+    """
+    data/<company>/<team>/<part> 계층과 파트별 사번 목록을 메모리에 유지합니다.
+    - 첫 사용(또는 서버 시작) 시 한 번만 디렉터리를 훑어 생성
+    - add_company/add_team/add_part/add_employee가 제자리에서 갱신
+    - 내용이 바뀔 때만 응답 JSON과 ETag를 다시 계산
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        load_employees: Callable[[], Dict[Tuple[str, str, str], List[str]]],
+    ):
+        # load_employees: {(company, team, part): [employeeID]} 전체를 반환하는 함수
+        self.data_dir = data_dir
+        self._load_employees = load_employees
+        # company → team → part → [employeeID]
+        self._tree: Optional[Dict[str, Dict[str, Dict[str, List[str]]]]] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._etag: Optional[str] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _subdirs(path: str) -> List[str]:
+        try:
+            return [e.name for e in os.scandir(path) if e.is_dir()]
+        except OSError:
+            return []
+
+    def build(self) -> None:
+        employees = self._load_employees()
+        tree: Dict[str, Dict[str, Dict[str, List[str]]]] = {}
+        for comp in self._subdirs(self.data_dir):
+            comp_dir = os.path.join(self.data_dir, comp)
+            tree[comp] = {}
+            for team in self._subdirs(comp_dir):
+                team_dir = os.path.join(comp_dir, team)
+                tree[comp][team] = {
+                    part: list(employees.get((comp, team, part), []))
+                    for part in self._subdirs(team_dir)
+                }
+        with self._lock:
+            self._tree = tree
+            self._changed()
+
+    def _ensure(self) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+        with self._lock:
+            if self._tree is None:
+                self.build()
+            return self._tree
+
+    def _changed(self) -> None:
+        self._payload = None
+        self._etag = None
+
+    def payload(self) -> Dict[str, Any]:
+        """GET /api/login 응답 본문 (LoginOptions 형태)"""
+        with self._lock:
+            tree = self._ensure()
+            if self._payload is None:
+                self._payload = {
+                    "companies": [
+                        {
+                            "name": comp,
+                            "teams": [
+                                {
+                                    "name": team,
+                                    "parts": [
+                                        {"name": part, "employees": list(emps)}
+                                        for part, emps in parts.items()
+                                    ],
+                                }
+                                for team, parts in teams.items()
+                            ],
+                        }
+                        for comp, teams in tree.items()
+                    ]
+                }
+            return self._payload
+
+    def etag(self) -> str:
+        with self._lock:
+            if self._etag is None:
+                body = json.dumps(self.payload(), ensure_ascii=False, sort_keys=True)
+                self._etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+            return self._etag
+
+    def companies(self) -> List[str]:
+        with self._lock:
+            return list(self._ensure())
+
+    def teams(self, company: str) -> List[str]:
+        with self._lock:
+            return list(self._ensure().get(company, {}))
+
+    def parts(self, company: str, team: str) -> List[str]:
+        with self._lock:
+            return list(self._ensure().get(company, {}).get(team, {}))
+
+    def add_company(self, company: str) -> None:
+        with self._lock:
+            tree = self._ensure()
+            if company not in tree:
+                tree[company] = {}
+                self._changed()
+
+    def add_team(self, company: str, team: str) -> None:
+        with self._lock:
+            self.add_company(company)
+            teams = self._ensure()[company]
+            if team not in teams:
+                teams[team] = {}
+                self._changed()
+
+    def add_part(self, company: str, team: str, part: str) -> None:
+        with self._lock:
+            self.add_team(company, team)
+            parts = self._ensure()[company][team]
+            if part not in parts:
+                parts[part] = []
+                self._changed()
+
+    def add_employee(self, company: str, team: str, part: str, employee_id: str) -> None:
+        with self._lock:
+            self.add_part(company, team, part)
+            emps = self._ensure()[company][team][part]
+            if employee_id not in emps:
+                emps.append(employee_id)
+                self._changed()
@@ -0,0 +1,199 @@
+# backend/utils/page_images.py
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from utils.embed_cache import CACHE_DIR
+
+# 렌더링한 페이지 PNG를 보관하는 디스크 캐시 (크기 상한을 넘으면 오래 안 쓴 것부터 삭제)
+PAGE_IMAGE_DIR = os.getenv("PAGE_IMAGE_DIR", os.path.join(CACHE_DIR, "pages"))
+PAGE_IMAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PAGE_RENDER_WORKERS = int(os.getenv("PAGE_RENDER_WORKERS", "2"))
+# 경로를 넘겨준 뒤 이 시간(초) 동안은 삭제하지 않음 (응답으로 파일을 보내는 중일 수 있으므로)
+PAGE_IMAGE_EVICT_GRACE = float(os.getenv("PAGE_IMAGE_EVICT_GRACE", "30"))
+
+# 변형별 렌더링 해상도 (DPI). dpi를 직접 지정하면 MIN~MAX 범위로 제한
+VARIANT_DPI = {"thumb": 40, "full": 150}
+MIN_DPI = 24
+MAX_DPI = 300
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def start_render_pool() -> ProcessPoolExecutor:
+    """
+    렌더링 프로세스 풀을 만듭니다 (서버 시작 시 호출).
+    스레드가 여럿 도는 서버 프로세스에서 fork하면 잠긴 락을 물려받아 멈출 수 있으므로 spawn.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=PAGE_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _render_pool
+
+
+def _render_page(pdf_path: str, page: int, dpi: int, out_path: str) -> int:
+    """워커 프로세스에서 실행: 페이지 하나를 PNG로 렌더링하고 파일 크기를 반환"""
+    with fitz.open(pdf_path) as pdf:
+        if not 0 <= page < pdf.page_count:
+            raise IndexError(f"페이지 범위를 벗어났습니다: {page} / {pdf.page_count}")
+        pix = pdf[page].get_pixmap(dpi=dpi)
+        tmp = out_path + f".{os.getpid()}.tmp"
+        pix.save(tmp, output="png")
+    os.replace(tmp, out_path)
+    return os.path.getsize(out_path)
+
+
+def resolve_dpi(variant: str = "full", dpi: Optional[int] = None) -> int:
+    if dpi is not None:
+        return max(MIN_DPI, min(MAX_DPI, int(dpi)))
+    if variant not in VARIANT_DPI:
+        raise ValueError(f"지원하지 않는 이미지 종류: {variant}")
+    return VARIANT_DPI[variant]
+
+
+class PageImageCache:
+    """
+    (PDF 경로, 수정 시각, 페이지, DPI)를 키로 하는 PNG 디스크 캐시.
+    - 요청된 페이지만 렌더링 (같은 페이지를 동시에 요청하면 렌더링은 한 번)
+    - 총 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 파일부터 삭제
+      (경로를 넘겨준 지 PAGE_IMAGE_EVICT_GRACE초가 안 된 파일은 남김)
+    - 사용 순서는 파일 mtime으로도 기록하므로 재시작 후에도 LRU 순서 유지
+    """
+
+    def __init__(self, directory: str = PAGE_IMAGE_DIR, max_bytes: int = PAGE_IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        # 키별로 마지막으로 경로를 넘겨준 시각 (time.monotonic)
+        self._handed_out: Dict[str, float] = {}
+        self._loaded = False
+        # 완료 콜백이 submit 중인 스레드에서 바로 불릴 수 있으므로 RLock
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                st = entry.stat()
+                files.append((st.st_mtime_ns, entry.name[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+        self._loaded = True
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".png")
+
+    @staticmethod
+    def key_for(pdf_path: str, page: int, dpi: int) -> str:
+        st = os.stat(pdf_path)
+        raw = f"{os.path.abspath(pdf_path)}\0{st.st_mtime_ns}\0{st.st_size}\0{page}\0{dpi}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            handed_out = self._handed_out.get(key)
+            if handed_out is not None and now - handed_out < PAGE_IMAGE_EVICT_GRACE:
+                # 가장 오래된 것도 방금 넘겨준 파일이면 나머지도 마찬가지 → 잠시 예산 초과 허용
+                break
+            size = self._entries.pop(key)
+            self._handed_out.pop(key, None)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _submit(self, pdf_path: str, page: int, dpi: int) -> Tuple[str, Optional[Future]]:
+        """캐시에 있으면 (경로, None), 없으면 렌더링 Future를 (공유해서) 반환"""
+        key = self.key_for(pdf_path, page, dpi)
+        path = self._path(key)
+        with self._lock:
+            self._load()
+            self._handed_out[key] = time.monotonic()
+            if key in self._entries and os.path.isfile(path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return path, None
+            fut = self._inflight.get(key)
+            if fut is None:
+                self.misses += 1
+                fut = start_render_pool().submit(_render_page, pdf_path, page, dpi, path)
+                self._inflight[key] = fut
+                fut.add_done_callback(lambda f, key=key: self._finish(key, f))
+            return path, fut
+
+    def _finish(self, key: str, fut: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if fut.exception() is not None:
+                self._handed_out.pop(key, None)
+                return
+            old = self._entries.pop(key, 0)
+            self._entries[key] = fut.result()
+            self._bytes += fut.result() - old
+            self._evict()
+
+    def get(self, pdf_path: str, page: int, dpi: int) -> str:
+        """렌더링된 PNG 경로 (필요하면 렌더링이 끝날 때까지 대기)"""
+        path, fut = self._submit(pdf_path, page, dpi)
+        if fut is not None:
+            fut.result()
+        else:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return path
+
+    def prefetch(self, pdf_path: str, page: int, dpi: int) -> None:
+        """기다리지 않고 렌더링만 예약 (출처 썸네일 미리 준비용)"""
+        try:
+            self._submit(pdf_path, page, dpi)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "rendering": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_page_images = PageImageCache()
+
+
+def get_page_image_cache() -> PageImageCache:
+    return _page_images
+
+
+def page_image_stats() -> Dict[str, Any]:
+    return _page_images.stats()
@@ -1,9 +1,13 @@
 # utils/pdf.py
 import os
-
-from typing import List
-from pdf2image import convert_from_path
-from langchain_community.document_loaders import PyMuPDFLoader
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import fitz  # PyMuPDF
+from typing import List, Callable, Iterator, Optional
 from langchain_core.documents.base import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
@@ -18,61 +22,118 @@ def save_uploadedfile(file_bytes: bytes, filename: str) -> str:
     return file_path
 
 
-# (2) PyMuPDFLoader를 통해 Document(페이지 단위) 리스트로 변환 후, 각 페이지를 작은 청크로 분할
-def pdf_to_documents(pdf_path: str) -> List[Document]:
-    # 1) PDF 전체를 페이지별 Document로 로드
-    loader = PyMuPDFLoader(pdf_path)
-    raw_page_docs = loader.load()  # 기본적으로 페이지 단위 Document 리스트
+class PdfParseError(RuntimeError):
+    """PDF를 열거나 텍스트를 추출하지 못했을 때 (인제스트 작업 오류 메시지 구분용)"""
 
-    # 2) 텍스트 청크 크기/오버랩 설정 (한글 기준 약 800자 ↔ 약 400~450토큰)
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=200)
 
-    docs: List[Document] = []
-    for page_doc in raw_page_docs:
-        # page_doc.page_content에는 해당 페이지의 전체 텍스트가 들어 있음
-        # page_doc.metadata에는 'source'? 'file_path'? 등 정보가 있음
-        page_number = page_doc.metadata.get("page_number", None)
-        # 청크 분할: 이 페이지를 chunk_size/overlap 기준으로 잘게 나눔
-        chunks = text_splitter.split_documents([page_doc])
-        for chunk in chunks:
-            # 메타데이터에 원본 파일 경로와 페이지 번호를 확실히 넣어둠
-            chunk.metadata["file_path"] = pdf_path
-            if page_number is not None:
-                chunk.metadata["page"] = page_number
-            docs.append(chunk)
+# (2) PDF를 페이지 구간(shard)으로 나눠 여러 프로세스에서 파싱 + 청크 분할
+# 텍스트 청크 크기/오버랩 설정 (한글 기준 약 800자 ↔ 약 400~450토큰)
+CHUNK_SIZE = 700
+CHUNK_OVERLAP = 200
 
-    return docs
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_SHARD = int(os.getenv("PDF_PAGES_PER_SHARD", "16"))
 
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
 
-# (3) PDF → 페이지별 이미지 변환 (변경 없음)
-#
-def convert_pdf_to_images(pdf_path: str, output_dir: str) -> List[str]:
-    """
-    PDF 파일을 페이지별로 PNG 이미지로 변환하여 output_dir 에 저장합니다.
-    - pdf_path: 변환할 PDF 파일 경로
-    - output_dir: 변환된 이미지가 저장될 디렉터리
-    반환값: 생성된 이미지 파일 경로 리스트 (예: [".../page_1.png", "…/page_2.png", ...])
-    """
 
-    if not os.path.isfile(pdf_path):
-        raise FileNotFoundError(f"PDF 파일을 찾을 수 없습니다: {pdf_path}")
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # 작업 스레드가 여럿 도는 서버 프로세스에서 fork하면 잠긴 락을 물려받아 멈출 수 있으므로 spawn
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
 
-    os.makedirs(output_dir, exist_ok=True)
 
-    # DPI 고정 (정수)
-    dpi = 450
+def _page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
 
-    # pdf2image의 convert_from_path를 사용해 페이지별 PIL.Image 리스트 생성
-    images = convert_from_path(pdf_path, dpi=dpi)
 
-    saved_paths: List[str] = []
-    for idx, img in enumerate(images):
-        page_no = idx + 1
-        img_filename = f"page_{page_no}.png"
-        img_path = os.path.join(output_dir, img_filename)
+def _parse_page_range(pdf_path: str, start: int, end: int) -> List[Document]:
+    """
+    워커 프로세스에서 실행: PDF를 직접 열어 [start, end) 페이지만 추출·분할합니다.
+    metadata의 page는 PyMuPDFLoader와 같이 0부터 시작합니다.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    docs: List[Document] = []
+    with fitz.open(pdf_path) as pdf:
+        total_pages = pdf.page_count
+        for page_no in range(start, end):
+            text = pdf.load_page(page_no).get_text()
+            for chunk in text_splitter.split_text(text):
+                docs.append(
+                    Document(
+                        page_content=chunk,
+                        metadata={
+                            "source": pdf_path,
+                            "file_path": pdf_path,
+                            "pdf_name": os.path.basename(pdf_path),
+                            "page": page_no,
+                            "total_pages": total_pages,
+                        },
+                    )
+                )
+    return docs
 
-        # PIL Image 객체를 PNG로 저장
-        img.save(img_path, "PNG")
-        saved_paths.append(img_path)
 
-    return saved_paths
+def iter_pdf_documents(
+    pdf_path: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+    workers: int = PDF_PARSE_WORKERS,
+    pages_per_shard: int = PDF_PAGES_PER_SHARD,
+) -> Iterator[Document]:
+    """
+    PDF 청크를 페이지 순서대로 흘려보내는 제너레이터.
+    - 페이지 구간을 프로세스 풀에 나눠 파싱 (각 워커가 PDF를 직접 엶)
+    - 동시에 메모리에 올라오는 구간은 workers * 2개로 제한
+    progress: (처리한 페이지 수, 전체 페이지 수)를 받는 콜백
+    """
+    total_pages = _page_count(pdf_path)
+    shards = [
+        (start, min(start + pages_per_shard, total_pages))
+        for start in range(0, total_pages, pages_per_shard)
+    ]
+
+    # 작은 PDF는 프로세스 왕복 비용이 더 크므로 현재 프로세스에서 처리
+    if workers <= 1 or len(shards) <= 1:
+        for start, end in shards:
+            yield from _parse_page_range(pdf_path, start, end)
+            if progress:
+                progress(end, total_pages)
+        return
+
+    pool = _get_parse_pool()
+    in_flight = deque()
+    shard_iter = iter(shards)
+    try:
+        for start, end in islice(shard_iter, workers * 2):
+            in_flight.append((end, pool.submit(_parse_page_range, pdf_path, start, end)))
+        while in_flight:
+            end, fut = in_flight.popleft()
+            docs = fut.result()
+            nxt = next(shard_iter, None)
+            if nxt is not None:
+                in_flight.append(
+                    (nxt[1], pool.submit(_parse_page_range, pdf_path, nxt[0], nxt[1]))
+                )
+            yield from docs
+            if progress:
+                progress(end, total_pages)
+    finally:
+        # 중간에 취소되면 아직 시작하지 않은 구간은 버림
+        for _, fut in in_flight:
+            fut.cancel()
+
+
+def pdf_to_documents(
+    pdf_path: str, progress: Optional[Callable[[int, int], None]] = None
+) -> List[Document]:
+    """iter_pdf_documents 결과를 리스트로 모아 반환"""
+    return list(iter_pdf_documents(pdf_path, progress=progress))
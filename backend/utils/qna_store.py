@@ -0,0 +1,183 @@
+# backend/utils/qna_store.py
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# qna/ 폴더 안의 파일: 스냅샷(기존 qna.json 형식 그대로) + 추가 전용 변경 로그
+SNAPSHOT_FILE = "qna.json"
+LOG_FILE = "qna.log"
+# 로그 줄 수가 이 값과 살아있는 문항 수 중 큰 값에 도달하면 스냅샷으로 압축 (압축 비용 분할상환 O(1))
+QNA_COMPACT_EVERY = int(os.getenv("QNA_COMPACT_EVERY", "200"))
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    """임시 파일에 쓴 뒤 교체하여 원자적으로 저장"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class QnAStore:
+    """
+    챗봇 하나의 문항 은행 (qna/qna.json + qna/qna.log).
+    - 메모리에 id → 문항 OrderedDict를 유지하여 조회/삭제는 O(1)
+    - 추가/삭제는 로그에 한 줄씩만 덧붙이고, 주기적으로 스냅샷에 압축
+    - 로그 연산(put/del)은 멱등이므로 압축 도중 중단되어도 재생 결과가 같음
+    - 챗봇별 잠금으로 동시 요청이 서로의 쓰기를 덮어쓰지 않음
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.snapshot_path = os.path.join(folder, SNAPSHOT_FILE)
+        self.log_path = os.path.join(folder, LOG_FILE)
+        self._items: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+        self._log_lines = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # ── 로드 ──
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        items: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        if os.path.isfile(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data if isinstance(data, list) else []:
+                if item.get("id") is None:
+                    item["id"] = max(items, default=0) + 1
+                items[int(item["id"])] = item
+
+        lines = 0
+        if os.path.isfile(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 마지막 줄이 쓰다 만 상태면 무시
+                        continue
+                    lines += 1
+                    if op.get("op") == "put":
+                        items[int(op["item"]["id"])] = op["item"]
+                    elif op.get("op") == "del":
+                        items.pop(int(op["id"]), None)
+
+        self._items = items
+        self._next_id = max(items, default=0) + 1
+        self._log_lines = lines
+        self._loaded = True
+
+    def exists(self) -> bool:
+        with self._lock:
+            return self._loaded or os.path.isfile(self.snapshot_path) or os.path.isfile(
+                self.log_path
+            )
+
+    # ── 읽기 ──
+    def count(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._items)
+
+    def get(self, qid: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            return self._items.get(qid)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """(offset부터 limit개의 문항, 전체 개수). limit이 None이면 끝까지"""
+        with self._lock:
+            self._load()
+            total = len(self._items)
+            values = iter(self._items.values())
+            for _ in range(min(offset, total)):
+                next(values)
+            end = total if limit is None else min(total, offset + limit)
+            return [next(values) for _ in range(max(0, end - offset))], total
+
+    # ── 쓰기 ──
+    def _append_log(self, ops: Iterable[Dict[str, Any]]) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        lines = [json.dumps(op, ensure_ascii=False) + "\n" for op in ops]
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_lines += len(lines)
+        if self._log_lines >= max(QNA_COMPACT_EVERY, len(self._items)):
+            self.compact()
+
+    def append(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """새 id를 부여해 추가하고, 추가된 문항을 반환"""
+        with self._lock:
+            self._load()
+            added: List[Dict[str, Any]] = []
+            for item in items:
+                item = dict(item, id=self._next_id)
+                self._next_id += 1
+                self._items[item["id"]] = item
+                added.append(item)
+            if added:
+                self._append_log({"op": "put", "item": item} for item in added)
+            return added
+
+    def delete(self, qid: int) -> bool:
+        with self._lock:
+            self._load()
+            if self._items.pop(qid, None) is None:
+                return False
+            self._append_log([{"op": "del", "id": qid}])
+            return True
+
+    def replace_all(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """문항 전체를 새로 교체 (id는 1부터 다시 부여)"""
+        with self._lock:
+            self._items = OrderedDict()
+            self._next_id = 1
+            self._loaded = True
+            for item in items:
+                item = dict(item, id=self._next_id)
+                self._next_id += 1
+                self._items[item["id"]] = item
+            self.compact()
+            return list(self._items.values())
+
+    def compact(self) -> None:
+        """현재 상태를 스냅샷에 원자적으로 기록한 뒤 로그를 비움"""
+        with self._lock:
+            self._load()
+            os.makedirs(self.folder, exist_ok=True)
+            _write_json_atomic(self.snapshot_path, list(self._items.values()))
+            # 스냅샷 교체 후에 로그를 비우므로, 그 사이 중단되어도 재생은 멱등
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self._log_lines = 0
+
+
+_stores: Dict[str, QnAStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_qna_store(folder: str) -> QnAStore:
+    """qna 폴더별 QnAStore (프로세스 안에서 하나만 유지)"""
+    key = os.path.abspath(folder)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = QnAStore(key)
+        return store
+
+
+def drop_qna_stores(path: str) -> None:
+    """path(챗봇 폴더 등) 아래의 QnAStore를 메모리에서 제거"""
+    prefix = os.path.abspath(path)
+    with _stores_lock:
+        for key in [k for k in _stores if k == prefix or k.startswith(prefix + os.sep)]:
+            del _stores[key]
@@ -1,165 +1,407 @@
 # backend/utils/rag.py
-import re
 import os
-import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
 
-from typing import List, Dict, Any, Optional
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from typing import List, Dict, Any, Iterator, Optional
+
+import numpy as np
+from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents.base import Document
 from langchain.prompts import PromptTemplate
 from langchain_core.runnables import Runnable  # ← 이 부분 추가
 from langchain.schema.output_parser import StrOutputParser
-from pydantic import BaseModel
-from fastapi import HTTPException
+
+from utils.store_cache import get_vector_store
+from utils.embedding import get_embeddings
+from utils.answer_cache import get_answer_cache
+from utils.lexical import get_lexical_index, rrf_fuse
+from utils.context import CONTEXT_TOKEN_BUDGET, merge_page_chunks, fit_to_budget
+from utils.tokens import count_tokens
+from utils.metrics import get_recorder, record_token_usage
+from utils.rerank import RERANK_MODE, RERANK_FETCH_K, rerank
+from utils.history import prepare_conversation
+from utils.llm_usage import TokenUsageCollector, callback_config
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
+# "openai"(기본) 또는 "fake"(로컬 테스트용, FAKE_LLM_RESPONSE를 토큰 단위로 스트리밍)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+FAKE_LLM_RESPONSE = os.getenv(
+    "FAKE_LLM_RESPONSE", "테스트 응답입니다. 컨텍스트를 참고해 답변했습니다."
+)
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
 
-def get_rag_chain() -> Runnable:
+# "hybrid"(기본, FAISS + BM25 역순위 결합) 또는 "dense"(FAISS만)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# 하이브리드 검색 시 각 검색기에서 top_k의 몇 배를 후보로 가져올지
+HYBRID_FETCH_MULTIPLIER = int(os.getenv("HYBRID_FETCH_MULTIPLIER", "4"))
+
+# 비동기 경로에서 블로킹 작업(인덱스 로드 등)을 넘길 전용 스레드 풀
+RAG_EXECUTOR_WORKERS = int(os.getenv("RAG_EXECUTOR_WORKERS", "8"))
+_rag_executor = ThreadPoolExecutor(
+    max_workers=RAG_EXECUTOR_WORKERS, thread_name_prefix="rag"
+)
+
+
+class _FakeChatModel(GenericFakeChatModel):
+    """GenericFakeChatModel에 응답 지연(latency_ms)을 더한 로컬 테스트용 모델"""
+
+    latency_ms: float = 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return super()._generate(messages, stop=stop, **kwargs)
+
+
+def get_llm(temperature: Optional[float] = None) -> BaseChatModel:
     """
-    RAG용 PromptTemplate과 LLM(여기서는 gpt-4o-mini)을 연결한 체인을 반환합니다.
+    채팅 모델(gpt-4o-mini)을 반환합니다. LLM_BACKEND=fake이면 네트워크 없이
+    고정 응답을 스트리밍하는 가짜 모델을 반환합니다.
     """
-    template = """
+    if LLM_BACKEND == "fake":
+        return _FakeChatModel(
+            messages=cycle([AIMessage(content=FAKE_LLM_RESPONSE)]),
+            latency_ms=FAKE_LLM_LATENCY_MS,
+        )
+    # 스트리밍 응답에도 마지막 청크에 실제 토큰 사용량이 실려 오도록 stream_usage=True
+    if temperature is None:
+        return ChatOpenAI(model="gpt-4o-mini", stream_usage=True)
+    return ChatOpenAI(model="gpt-4o-mini", temperature=temperature, stream_usage=True)
+
+
+RAG_PROMPT = """
     다음의 컨텍스트를 활용해서 질문에 답변해줘
     - 질문에 대한 응답을 해줘
     - 간결하게 5줄 이내로 해줘
     - 곧바로 응답결과를 말해줘
 
-    컨텍스트 : {context}
+    {history}컨텍스트 : {context}
 
     질문: {question}
 
     응답:"""
 
-    custom_rag_prompt = PromptTemplate.from_template(template)
-    model = ChatOpenAI(model="gpt-4o-mini")
+
+def get_rag_chain() -> Runnable:
+    """
+    RAG용 PromptTemplate과 LLM(여기서는 gpt-4o-mini)을 연결한 체인을 반환합니다.
+    """
+    custom_rag_prompt = PromptTemplate.from_template(RAG_PROMPT)
+    model = get_llm()
 
     return custom_rag_prompt | model | StrOutputParser()
 
 
-def process_question(
-    user_question: str, index_dir: str, top_k: int = 3
-) -> Dict[str, Any]:
+def _dense_positions(db: FAISS, query_vec: List[float], k: int) -> List[int]:
+    """FAISS 인덱스에서 질의 벡터와 가까운 순서대로 위치 반환"""
+    _, idx = db.index.search(np.asarray([query_vec], dtype="float32"), k)
+    return [int(i) for i in idx[0] if i != -1]
+
+
+def select_documents(
+    db: FAISS, index_dir: str, user_question: str, query_vec: List[float], top_k: int
+) -> List[Document]:
+    """
+    1) dense(FAISS) 검색 결과와 어휘(BM25) 검색 결과를 RRF로 합쳐 후보 선택
+       (RETRIEVAL_MODE=dense이면 FAISS 결과만 사용)
+    2) 재순위화를 쓰면 후보를 RERANK_FETCH_K개까지 넉넉히 가져온 뒤
+       rerank()로 겹치는 청크를 줄이면서 top_k개를 고름
+    단계별 지연시간은 metrics의 retrieval_search / retrieval_rerank에 기록됩니다.
+    """
+    started = time.perf_counter()
+    n_candidates = top_k if RERANK_MODE == "none" else max(top_k, RERANK_FETCH_K)
+    if RETRIEVAL_MODE != "hybrid":
+        positions = _dense_positions(db, query_vec, n_candidates)
+        ids = [db.index_to_docstore_id[p] for p in positions]
+        pos_of = dict(zip(ids, positions))
+    else:
+        fetch_k = max(top_k * HYBRID_FETCH_MULTIPLIER, n_candidates)
+        positions = _dense_positions(db, query_vec, fetch_k)
+        dense = [db.index_to_docstore_id[p] for p in positions]
+        pos_of = dict(zip(dense, positions))
+        lexical = get_lexical_index(index_dir, db)
+        if lexical is None:
+            ids = dense[:n_candidates]
+        else:
+            lex = [doc_id for doc_id, _ in lexical.search(user_question, fetch_k)]
+            ids = rrf_fuse([dense, lex], n_candidates)
+            for doc_id in ids:
+                # BM25에서만 나온 후보: 위치가 FAISS와 일치할 때만 저장된 벡터를 사용
+                pos = pos_of.get(doc_id, lexical.position(doc_id))
+                if pos is not None and pos < db.index.ntotal and db.index_to_docstore_id[pos] == doc_id:
+                    pos_of[doc_id] = pos
+    candidates = [(db.docstore.search(doc_id), pos_of.get(doc_id)) for doc_id in ids]
+    candidates = [(d, p) for d, p in candidates if isinstance(d, Document)]
+    searched = time.perf_counter()
+    get_recorder("retrieval_search").record(searched - started)
+
+    docs = rerank(
+        db,
+        user_question,
+        query_vec,
+        [d for d, _ in candidates],
+        [p for _, p in candidates],
+        top_k,
+    )
+    get_recorder("retrieval_rerank").record(time.perf_counter() - searched)
+    return docs
+
+
+def retrieve_context(user_question: str, index_dir: str, top_k: int = 3):
     """
     1) FAISS 인덱스 로드
-    2) Retriever로 상위 top_k개 Document 검색
+    2) dense + BM25 하이브리드 검색으로 상위 top_k개 Document 선택
     3) 각 Document의 metadata(pdf_name, page, image_path)를 활용해
        컨텍스트 문자열을 생성
-    4) get_rag_chain()으로 RAG 체인 실행해 답변 생성
-    5) {"answer": str, "sources": List[{"pdf_name","page","text","image_path"}]} 형태로 반환
+    반환값: (context_str, sources)
     """
-    # 1) FAISS 인덱스 로드
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    db = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    # 1) FAISS 인덱스 로드 (캐시에 있으면 디스크를 읽지 않음)
+    db = get_vector_store(index_dir)
 
-    # 2) Retriever 생성 후 상위 top_k개 Document 검색
-    retriever = db.as_retriever(search_kwargs={"k": top_k})
-    retrieved_docs: List[Document] = retriever.get_relevant_documents(user_question)
+    # 2) 상위 top_k개 Document 검색
+    query_vec = db.embeddings.embed_query(user_question)
+    retrieved_docs = select_documents(db, index_dir, user_question, query_vec, top_k)
 
-    # 3) 검색된 Document 각각에서 metadata를 가져와 컨텍스트 파트와 sources 리스트 구성
-    context_parts = []
-    sources: List[Dict[str, Any]] = []
+    # 3) 컨텍스트 문자열과 sources 구성
+    return build_context(retrieved_docs)
 
-    for doc in retrieved_docs:
-        # 3-1) metadata에서 필요한 값을 꺼내기
-        md = doc.metadata or {}
-        pdf_name = md.get("pdf_name", "UnknownPDF")
-        page_no = md.get("page", None)
-        image_path = md.get("image_path", None)
 
-        text = doc.page_content or ""
+async def aretrieve_context(user_question: str, index_dir: str, top_k: int = 3):
+    """retrieve_context의 비동기 버전 (인덱스 로드/검색은 전용 스레드 풀에서)"""
+    loop = asyncio.get_running_loop()
+    db = await loop.run_in_executor(_rag_executor, get_vector_store, index_dir)
+    query_vec = await db.embeddings.aembed_query(user_question)
+    retrieved_docs = await loop.run_in_executor(
+        _rag_executor, select_documents, db, index_dir, user_question, query_vec, top_k
+    )
+    return build_context(retrieved_docs)
 
-        # 3-2) 컨텍스트 문자열 예시: "[reportA.pdf - Page 3]\n해당 페이지 텍스트..."
-        if page_no is not None:
-            context_parts.append(f"[{pdf_name} - Page {page_no + 1}]\n{text}")
-        else:
-            # page 정보가 없으면 그냥 pdf 이름만 붙임
-            context_parts.append(f"[{pdf_name}]\n{text}")
-
-        # 3-3) sources 리스트에 리턴할 딕셔너리
-        sources.append(
-            {
-                "pdf_name": pdf_name,
-                "page": page_no,
-                "text": text,
-                "image_path": image_path,
-            }
-        )
 
-    # 3-4) context를 한 문자열로 합치기 (페이지별로 두 줄 띄어쓰기)
-    context_str = "\n\n".join(context_parts)
+def build_context(retrieved_docs: List[Document], token_budget: int = CONTEXT_TOKEN_BUDGET):
+    """
+    검색된 Document를 컨텍스트 문자열과 sources 리스트로 구성
+    1) 같은 페이지의 청크는 겹치는 부분을 합쳐 한 단락으로 (페이지 머리글도 한 번만)
+    2) 순위대로 token_budget 토큰까지만 넣고, 넘치는 단락은 잘라냄
+    반환값: (context_str, sources)
+    """
+    passages = merge_page_chunks(retrieved_docs)
+    context_parts, used, _ = fit_to_budget(passages, token_budget)
 
-    # 4) RAG 체인 실행
-    chain = get_rag_chain()
-    result = chain.invoke({"context": context_str, "question": user_question})
-    answer = result.strip()
+    # sources 리스트에 리턴할 딕셔너리 (컨텍스트에 실제로 들어간 단락만)
+    sources: List[Dict[str, Any]] = [
+        {
+            "pdf_name": p["pdf_name"],
+            "page": p["page"],
+            "text": p["text"],
+            "image_path": p["image_path"],
+        }
+        for p in used
+    ]
 
-    # 5) 최종 리턴
-    return {"answer": answer, "sources": sources}
+    # context를 한 문자열로 합치기 (페이지별로 두 줄 띄어쓰기)
+    context_str = "\n\n".join(context_parts)
+    return context_str, sources
 
 
-class MCQItem(BaseModel):
-    id: Optional[int] = None
-    question: str
-    choices: List[str]
-    answerIndex: int
+def usage_collector() -> TokenUsageCollector:
+    """요청 한 건의 LLM 토큰 사용량 수집기 (가짜 LLM은 사용량을 보고하지 않으므로 tiktoken으로 추정)"""
+    return TokenUsageCollector(estimate=LLM_BACKEND == "fake")
 
 
-def generate_mc_questions(index_dir: str, n_questions: int = 5) -> List[MCQItem]:
+def token_usage(usage: TokenUsageCollector, context_str: str = "") -> Dict[str, int]:
     """
-    FAISS 인덱스에서 상위 컨텍스트를 추출하여,
-    객관식 문제를 생성합니다.
+    요청 한 건에서 호출한 모든 LLM(요약/재작성/답변)의 프롬프트·응답 토큰 합계를 기록하고 반환합니다.
+    context_tokens는 프롬프트에 넣은 컨텍스트의 tiktoken 기준 크기 (답변 캐시 적중 시 0)
     """
-    # 1) FAISS 인덱스 로드 및 retriever
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    db = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
-    retriever = db.as_retriever(search_kwargs={"k": 3})
-    docs: List[Document] = retriever.get_relevant_documents("")
+    result = usage.usage(context_tokens=count_tokens(context_str))
+    record_token_usage(result)
+    return result
+
 
-    # 2) 컨텍스트 합치기
-    context = "\n\n".join(doc.page_content for doc in docs)
+def _cacheable(conv: Dict[str, str], user_question: str, use_cache: bool) -> bool:
+    # 대화 중인데 질의를 재작성하지 못했으면 같은 문장이라도 뜻이 다를 수 있어 캐시를 쓰지 않음
+    return use_cache and (not conv["history"] or conv["query"] != user_question)
 
-    # 3) MCQ 생성 프롬프트 구성 (예시 JSON 중괄호 이스케이프)
-    prompt_tpl = """
-    다음 컨텍스트를 바탕으로 객관식 4지선다 문제 {n}개를 JSON 형식으로 생성하세요.
-    출력 형식 예시:
-    [  {{ "question": "예시 질문?", "choices": ["A","B","C","D"], "answerIndex": 2 }}  , … ]
 
-    컨텍스트:
-    {context}
+def process_question(
+    user_question: str,
+    index_dir: str,
+    top_k: int = 3,
+    use_cache: bool = True,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
     """
+    ※) 대화 기록이 있으면 최근 대화/이전 요약을 준비하고 질문을 검색용 질의로 재작성
+    0) 의미 기반 답변 캐시 조회 (비슷한 질문이 있었으면 바로 반환)
+    1) retrieve_context()로 상위 top_k개 청크의 컨텍스트/출처 구성
+    2) get_rag_chain()으로 RAG 체인 실행해 답변 생성
+    3) {"answer": str, "sources": List[{"pdf_name","page","text","image_path"}],
+        "usage": {"prompt_tokens", "completion_tokens", "context_tokens", "llm_calls"}} 형태로 반환
+       (usage는 대화 요약/질의 재작성 호출까지 합친 제공자 보고 사용량)
+    """
+    usage = usage_collector()
+    conv = prepare_conversation(user_question, chat_history, session_id, usage)
+    query = conv["query"]
+
+    # 0) 답변 캐시 (질문 임베딩은 임베딩 캐시에 남아 검색 단계에서 재사용됨)
+    use_cache = _cacheable(conv, user_question, use_cache)
+    query_vec = get_embeddings().embed_query(query) if use_cache else None
+    if query_vec is not None:
+        cached = get_answer_cache().lookup(index_dir, query_vec)
+        if cached is not None:
+            return {"answer": cached["answer"], "sources": cached["sources"], "usage": token_usage(usage)}
 
-    prompt = PromptTemplate.from_template(prompt_tpl)
+    context_str, sources = retrieve_context(query, index_dir, top_k)
 
-    # 4) LLM 체인 실행
-    chain: Runnable = (
-        prompt | ChatOpenAI(model="gpt-4o-mini", temperature=0.7) | StrOutputParser()
+    # 2) RAG 체인 실행
+    chain = get_rag_chain()
+    result = chain.invoke(
+        {"history": conv["history"], "context": context_str, "question": user_question},
+        config=callback_config(usage),
     )
+    answer = result.strip()
 
-    try:
-        raw = chain.invoke({"context": context, "n": n_questions})
-        cleaned = re.sub(r"```[^\n]*\n", "", raw)
-        cleaned = cleaned.replace("```", "")
-        json_str = cleaned.strip()
-        items = json.loads(json_str)
-    except json.JSONDecodeError as e:
-        # 디버깅: LLM 응답과 정제된 문자열을 로그에 남기고 예외 던짐
-        print("❌ Failed to parse JSON. raw:", repr(raw))
-        print("❌ Cleaned JSON str:", json_str)
-        raise HTTPException(
-            status_code=500, detail="MCQ 생성 실패 (잘못된 JSON 응답)"
-        ) from e
-
-    # 5) 데이터 모델링
-    mcqs: List[MCQItem] = []
-    for idx, item in enumerate(items, start=1):
-        mcqs.append(
-            MCQItem(
-                id=idx,
-                question=item.get("question"),
-                choices=item.get("choices", []),
-                answerIndex=item.get("answerIndex", 0),
-            )
+    if query_vec is not None:
+        get_answer_cache().store(index_dir, query_vec, answer, sources)
+
+    # 3) 최종 리턴
+    return {
+        "answer": answer,
+        "sources": sources,
+        "usage": token_usage(usage, context_str),
+    }
+
+
+async def aprocess_question(
+    user_question: str,
+    index_dir: str,
+    top_k: int = 3,
+    use_cache: bool = True,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """process_question의 비동기 버전 (검색/LLM 호출 모두 이벤트 루프를 막지 않음)"""
+    loop = asyncio.get_running_loop()
+    usage = usage_collector()
+    conv = await loop.run_in_executor(
+        _rag_executor, prepare_conversation, user_question, chat_history, session_id, usage
+    )
+    query = conv["query"]
+
+    use_cache = _cacheable(conv, user_question, use_cache)
+    query_vec = await get_embeddings().aembed_query(query) if use_cache else None
+    answer_cache = get_answer_cache()
+    if query_vec is not None:
+        # 인덱스 서명 확인(stat/scandir)과 잠금이 있으므로 이벤트 루프 밖에서
+        cached = await loop.run_in_executor(_rag_executor, answer_cache.lookup, index_dir, query_vec)
+        if cached is not None:
+            return {"answer": cached["answer"], "sources": cached["sources"], "usage": token_usage(usage)}
+
+    context_str, sources = await aretrieve_context(query, index_dir, top_k)
+    chain = get_rag_chain()
+    result = await chain.ainvoke(
+        {"history": conv["history"], "context": context_str, "question": user_question},
+        config=callback_config(usage),
+    )
+    answer = result.strip()
+
+    if query_vec is not None:
+        await loop.run_in_executor(
+            _rag_executor, answer_cache.store, index_dir, query_vec, answer, sources
         )
-    return mcqs
+    return {
+        "answer": answer,
+        "sources": sources,
+        "usage": token_usage(usage, context_str),
+    }
+
+
+def stream_question(
+    user_question: str,
+    index_dir: str,
+    top_k: int = 3,
+    use_cache: bool = True,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    process_question의 스트리밍 버전. 다음 이벤트를 순서대로 yield 합니다.
+    - {"event": "sources", "data": sources}           검색 직후
+    - {"event": "token", "data": {"text": str}}        체인이 토큰을 낼 때마다
+    - {"event": "done", "data": {"answer", "query", "cached", "retrieval_ms", "ttft_ms", "total_ms", "usage"}}
+    답변 캐시에 적중하면 저장된 답변 전체를 token 한 번으로 보냅니다.
+    동기 제너레이터이므로 async 핸들러에서는 next()를 스레드에서 호출해야 합니다 (/chat/stream 참고).
+    """
+    started = time.perf_counter()
+    usage = usage_collector()
+    conv = prepare_conversation(user_question, chat_history, session_id, usage)
+    query = conv["query"]
+    use_cache = _cacheable(conv, user_question, use_cache)
+    query_vec = get_embeddings().embed_query(query) if use_cache else None
+    cached = get_answer_cache().lookup(index_dir, query_vec) if query_vec is not None else None
+    if cached is not None:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield {"event": "sources", "data": cached["sources"]}
+        yield {"event": "token", "data": {"text": cached["answer"]}}
+        yield {
+            "event": "done",
+            "data": {
+                "answer": cached["answer"],
+                "query": query,
+                "cached": True,
+                "retrieval_ms": elapsed_ms,
+                "ttft_ms": elapsed_ms,
+                "total_ms": elapsed_ms,
+                "usage": token_usage(usage),
+            },
+        }
+        return
+
+    context_str, sources = retrieve_context(query, index_dir, top_k)
+    retrieval_ms = (time.perf_counter() - started) * 1000
+    yield {"event": "sources", "data": sources}
+
+    chain = get_rag_chain()
+    parts: List[str] = []
+    ttft_ms: Optional[float] = None
+    for token in chain.stream(
+        {"history": conv["history"], "context": context_str, "question": user_question},
+        config=callback_config(usage),
+    ):
+        if not token:
+            continue
+        if ttft_ms is None:
+            ttft_ms = (time.perf_counter() - started) * 1000
+        parts.append(token)
+        yield {"event": "token", "data": {"text": token}}
+
+    answer = "".join(parts).strip()
+    if query_vec is not None:
+        get_answer_cache().store(index_dir, query_vec, answer, sources)
+
+    yield {
+        "event": "done",
+        "data": {
+            "answer": answer,
+            "query": query,
+            "cached": False,
+            "retrieval_ms": round(retrieval_ms, 1),
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "usage": token_usage(usage, context_str),
+        },
+    }
@@ -0,0 +1,179 @@
+# backend/utils/rerank.py
+import os
+import threading
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents.base import Document
+
+from utils.lexical import tokenize
+
+# 재순위화 방식: mmr(기본, 저장된 벡터로 MMR) | lexical(질의 단어 겹침) | cross_encoder | none
+RERANK_MODE = os.getenv("RERANK_MODE", "mmr")
+# 1차 검색에서 가져올 후보 수 (이 중에서 top_k개를 다시 고름)
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+# 관련도와 다양성의 비중 (1이면 관련도만, 0이면 다양성만)
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# MMR 관련도에 1차 검색(하이브리드) 순위를 섞는 비중 (0이면 벡터 유사도만)
+MMR_RANK_WEIGHT = float(os.getenv("MMR_RANK_WEIGHT", "0.5"))
+# 이미 고른 청크와 코사인 유사도가 이 이상이면 (겹침 구간이 같은 청크 등) 다른 후보가 없을 때만 선택
+MMR_DUP_COSINE = float(os.getenv("MMR_DUP_COSINE", "0.98"))
+# cross_encoder 모드에서 사용할 로컬 모델 (sentence-transformers 필요, 없으면 lexical로 대체)
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "BAAI/bge-reranker-base")
+# 이미 고른 청크와 단어 집합이 이만큼 겹치면 같은 내용으로 보고 제외 (cross_encoder 모드)
+RERANK_DUP_JACCARD = float(os.getenv("RERANK_DUP_JACCARD", "0.8"))
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+_direct_map_lock = threading.Lock()
+
+
+def stored_vectors(db: FAISS, positions: Sequence[int]) -> Optional[np.ndarray]:
+    """
+    인덱스에 저장된 벡터를 위치별로 꺼냅니다 (질의 때 다시 임베딩하지 않음).
+    IVF는 direct map이 필요하고, 복원을 지원하지 않는 인덱스면 None.
+    """
+    try:
+        ivf = faiss.try_extract_index_ivf(db.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            # 캐시된 인덱스를 여러 요청이 공유하므로 한 번만 만들도록
+            with _direct_map_lock:
+                if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                    ivf.make_direct_map()
+        return np.vstack([db.index.reconstruct(int(p)) for p in positions]).astype("float32")
+    except RuntimeError:
+        return None
+
+
+def mmr_select(
+    query_vec: Sequence[float],
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = MMR_LAMBDA,
+    rank_weight: float = MMR_RANK_WEIGHT,
+) -> List[int]:
+    """
+    Maximal Marginal Relevance: 질의와 가깝고 이미 고른 청크와는 덜 비슷한 순서로 k개 선택.
+    vectors는 1차 검색 순위순이며, 관련도 = 코사인 유사도(0~1로 정규화)와 순위 점수의 가중합
+    (BM25로만 잡힌 에러코드 같은 후보가 벡터 유사도만으로 밀려나지 않도록).
+    반환값은 vectors의 행 번호.
+    """
+    if len(vectors) == 0:
+        return []
+    vecs = _unit(np.asarray(vectors, dtype="float32"))
+    cosine = vecs @ _unit(np.asarray(query_vec, dtype="float32"))
+    spread = float(cosine.max() - cosine.min())
+    cosine = (cosine - cosine.min()) / spread if spread > 1e-9 else np.ones_like(cosine)
+    rank_score = 1.0 - np.arange(len(vecs), dtype="float32") / len(vecs)
+    relevance = (1 - rank_weight) * cosine + rank_weight * rank_score
+    selected = [int(np.argmax(relevance))]
+    redundancy = vecs @ vecs[selected[0]]
+    while len(selected) < min(k, len(vecs)):
+        score = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        score[redundancy >= MMR_DUP_COSINE] -= 2.0
+        score[selected] = -np.inf
+        nxt = int(np.argmax(score))
+        selected.append(nxt)
+        redundancy = np.maximum(redundancy, vecs @ vecs[nxt])
+    return selected
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def lexical_select(query: str, docs: List[Document], k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """
+    네트워크/모델 없이 동작하는 재순위화.
+    관련도 = 질의 토큰 중 청크에 나오는 비율 (+ 1차 검색 순위를 동점 처리용으로 약간),
+    중복도 = 이미 고른 청크와의 토큰 Jaccard. MMR과 같은 방식으로 k개 선택.
+    """
+    q = set(tokenize(query))
+    toks = [set(tokenize(d.page_content)) for d in docs]
+    relevance = np.array(
+        [(len(q & t) / len(q) if q else 0.0) + 0.01 / (rank + 1) for rank, t in enumerate(toks)]
+    )
+    selected: List[int] = []
+    while len(selected) < min(k, len(docs)):
+        best, best_score = -1, -np.inf
+        for i in range(len(docs)):
+            if i in selected:
+                continue
+            redundancy = max((_jaccard(toks[i], toks[j]) for j in selected), default=0.0)
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+_cross_encoder: Any = None
+_cross_encoder_lock = threading.Lock()
+_cross_encoder_failed = False
+
+
+def _get_cross_encoder() -> Any:
+    """CROSS_ENCODER_MODEL을 한 번만 로드 (sentence-transformers가 없거나 실패하면 None)"""
+    global _cross_encoder, _cross_encoder_failed
+    with _cross_encoder_lock:
+        if _cross_encoder is None and not _cross_encoder_failed:
+            try:
+                from sentence_transformers import CrossEncoder
+
+                _cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+            except Exception as e:
+                _cross_encoder_failed = True
+                print(f"[Rerank] cross-encoder 로드 실패, lexical 재순위화로 대체: {e!r}")
+        return _cross_encoder
+
+
+def cross_encoder_select(query: str, docs: List[Document], k: int) -> Optional[List[int]]:
+    """(질의, 청크) 쌍을 cross-encoder 점수 순으로 정렬하고 거의 같은 청크는 건너뜀"""
+    model = _get_cross_encoder()
+    if model is None:
+        return None
+    scores = model.predict([(query, d.page_content) for d in docs])
+    toks = [set(tokenize(d.page_content)) for d in docs]
+    selected: List[int] = []
+    for i in np.argsort(-np.asarray(scores)):
+        if all(_jaccard(toks[i], toks[j]) < RERANK_DUP_JACCARD for j in selected):
+            selected.append(int(i))
+        if len(selected) == k:
+            break
+    return selected
+
+
+def rerank(
+    db: FAISS,
+    query: str,
+    query_vec: Sequence[float],
+    docs: List[Document],
+    positions: Sequence[Optional[int]],
+    k: int,
+    mode: str = RERANK_MODE,
+) -> List[Document]:
+    """
+    1차 검색 후보(docs, 순위순)에서 최종 k개를 고릅니다.
+    positions: 각 후보의 FAISS 위치 (모르면 None) — mmr 모드에서 저장된 벡터를 꺼낼 때 사용
+    mmr인데 벡터를 꺼낼 수 없으면 lexical, cross_encoder를 쓸 수 없으면 lexical로 대체합니다.
+    """
+    if mode == "none" or len(docs) <= 1:
+        return docs[:k]
+    order: Optional[List[int]] = None
+    if mode == "mmr" and all(p is not None for p in positions):
+        vectors = stored_vectors(db, positions)
+        if vectors is not None:
+            order = mmr_select(query_vec, vectors, k)
+    elif mode == "cross_encoder":
+        order = cross_encoder_select(query, docs, k)
+    elif mode not in ("mmr", "lexical"):
+        raise ValueError(f"지원하지 않는 재순위화 방식: {mode}")
+    if order is None:
+        order = lexical_select(query, docs, k)
+    return [docs[i] for i in order]
@@ -0,0 +1,136 @@
+# backend/utils/store_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+
+from utils.compact_store import is_index_data_file
+from utils.embedding import load_vector_store
+
+# 캐시가 점유할 수 있는 최대 메모리(바이트). 인덱스 파일 크기 합으로 근사합니다.
+STORE_CACHE_MAX_BYTES = int(os.getenv("STORE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def index_signature(index_dir: str, data_only: bool = True) -> Tuple[int, int]:
+    """
+    index_dir의 (최신 mtime_ns, 총 바이트)를 반환합니다.
+    data_only: 인덱스 데이터 파일(벡터/docstore)만 봄. 학습 중 저장되는 체크포인트나
+               매니페스트로 로드된 인덱스와 답변 캐시가 무효화되지 않도록 기본값.
+               False면 디렉터리 자체와 모든 파일을 봅니다 (통째로 교체되는 bm25_index/ 등).
+    """
+    latest = 0 if data_only else os.stat(index_dir).st_mtime_ns
+    total = 0
+    for entry in os.scandir(index_dir):
+        if entry.is_file() and (not data_only or is_index_data_file(entry.name)):
+            st = entry.stat()
+            latest = max(latest, st.st_mtime_ns)
+            total += st.st_size
+    return latest, total
+
+
+class _Entry:
+    __slots__ = ("store", "signature", "nbytes")
+
+    def __init__(self, store: FAISS, signature: Tuple[int, int]):
+        self.store = store
+        self.signature = signature
+        self.nbytes = signature[1]
+
+
+class VectorStoreCache:
+    """
+    index_dir별로 로드된 FAISS 벡터스토어를 보관하는 LRU 캐시.
+    - faiss_index/의 mtime이 바뀌면(upload_pdf 재학습) 자동으로 다시 로드
+    - 총 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+    """
+
+    def __init__(self, max_bytes: int = STORE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, index_dir: str, loader: Callable[[str], FAISS]) -> FAISS:
+        key = os.path.abspath(index_dir)
+        signature = index_signature(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.store
+            self.misses += 1
+
+        # 디스크 로드는 락 밖에서 수행 (동시 로드는 허용, 마지막 결과가 남음)
+        started = time.perf_counter()
+        store = loader(key)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.load_seconds += elapsed
+            self._remove(key)
+            entry = _Entry(store, signature)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+        return store
+
+    def invalidate(self, index_dir: Optional[str] = None) -> None:
+        """index_dir 하나(또는 그 하위 전체)를 캐시에서 제거. None이면 전부 비움"""
+        with self._lock:
+            if index_dir is None:
+                for key in list(self._entries):
+                    self._remove(key)
+                return
+            prefix = os.path.abspath(index_dir)
+            for key in [k for k in self._entries if k == prefix or k.startswith(prefix + os.sep)]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 3),
+            }
+
+    def _remove(self, key: str) -> None:
+        # 내보낸 항목을 아직 쓰는 요청이 있을 수 있으므로 닫지 않음.
+        # SQLite 연결과 mmap 벡터는 마지막 참조가 사라질 때 함께 해제됩니다.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        # 방금 넣은 항목 하나는 예산을 넘더라도 유지
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+_store_cache = VectorStoreCache()
+
+
+def get_vector_store(index_dir: str) -> FAISS:
+    """캐시를 거쳐 FAISS 벡터스토어를 반환합니다."""
+    return _store_cache.get(index_dir, load_vector_store)
+
+
+def invalidate_vector_store(index_dir: Optional[str] = None) -> None:
+    _store_cache.invalidate(index_dir)
+
+
+def store_cache_stats() -> Dict[str, Any]:
+    return _store_cache.stats()
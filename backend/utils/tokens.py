@@ -0,0 +1,69 @@
+# backend/utils/tokens.py
+import os
+import threading
+from typing import Optional
+
+# 토큰 수를 셀 때 기준으로 삼는 모델 (tiktoken 인코딩 선택용)
+TOKEN_MODEL = os.getenv("TOKEN_MODEL", "gpt-4o-mini")
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """
+    tiktoken 인코더를 한 번만 만듭니다.
+    BPE 파일을 내려받을 수 없는 환경(오프라인 등)이면 None을 반환하고 근사치를 사용합니다.
+    """
+    global _encoder, _encoder_loaded
+    with _encoder_lock:
+        if not _encoder_loaded:
+            _encoder_loaded = True
+            try:
+                import tiktoken
+
+                try:
+                    _encoder = tiktoken.encoding_for_model(TOKEN_MODEL)
+                except KeyError:
+                    _encoder = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"[Tokens] tiktoken 사용 불가, 근사치로 계산합니다: {e!r}")
+                _encoder = None
+        return _encoder
+
+
+def _approx_tokens(text: str) -> int:
+    # ASCII는 약 4글자당 1토큰, 한글 등 비ASCII 문자는 글자당 1토큰으로 보수적으로 추정
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is None:
+        return _approx_tokens(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """text를 앞에서부터 max_tokens 토큰 이내로 자름"""
+    if max_tokens <= 0:
+        return ""
+    enc = _get_encoder()
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else enc.decode(ids[:max_tokens])
+    if _approx_tokens(text) <= max_tokens:
+        return text
+    # 근사 모드: 이진 탐색으로 예산에 맞는 가장 긴 접두어를 찾음
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _approx_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
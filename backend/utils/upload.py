@@ -0,0 +1,68 @@
+# backend/utils/upload.py
+import os
+import uuid
+import hashlib
+from typing import Any, BinaryIO, Dict, Optional
+
+# 업로드 PDF 최대 크기 (바이트)와 복사 단위
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(300 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """경로 구분자를 떼어내 pdf/ 폴더 밖으로 나가지 못하게 함"""
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name or name in (".", ".."):
+        raise ValueError("파일 이름이 올바르지 않습니다.")
+    return name
+
+
+def stream_to_file(
+    src: BinaryIO,
+    dest_path: str,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    src를 chunk_size 단위로 읽어 dest_path 옆 임시 파일에 쓰면서 SHA-256을 계산합니다.
+    max_bytes를 넘으면 임시 파일을 지우고 UploadTooLarge를 던집니다.
+    호출 측은 중복 여부를 확인한 뒤 commit_upload(임시 파일 → dest_path로 rename)
+    또는 discard_upload를 호출합니다.
+    반환: {"tmp_path", "sha256", "size"}
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex[:8]}.part"
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                block = src.read(chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"최대 {max_bytes // (1024 * 1024)}MB까지 업로드할 수 있습니다.")
+                h.update(block)
+                out.write(block)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        discard_upload(tmp_path)
+        raise
+    return {"tmp_path": tmp_path, "sha256": h.hexdigest(), "size": size}
+
+
+def commit_upload(tmp_path: str, dest_path: str) -> None:
+    os.replace(tmp_path, dest_path)
+
+
+def discard_upload(tmp_path: str) -> None:
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
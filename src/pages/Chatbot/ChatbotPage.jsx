@@ -209,9 +209,18 @@ const onSelectEmployee = name => {
     fd.append('part', selectedPart);
     fd.append('chatbot_name', uploadName.trim());
     try {
-      await axios.post('http://localhost:8088/upload_pdf', fd, {
+      const { data } = await axios.post('http://localhost:8088/upload_pdf', fd, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
+      // 인덱싱은 백그라운드 작업으로 진행되므로 끝날 때까지 상태를 조회
+      let job = { status: 'queued' };
+      while (data.job_id && (job.status === 'queued' || job.status === 'running')) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = (await axios.get(`http://localhost:8088/jobs/${data.job_id}`)).data;
+      }
+      if (data.job_id && job.status !== 'succeeded') {
+        throw new Error(job.error || job.status);
+      }
       alert('✅ 챗봇 업로드 완료');
       await fetchChatbotList(selectedCompany, selectedTeam, selectedPart);
     } catch (err) {
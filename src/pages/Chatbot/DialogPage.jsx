@@ -36,6 +36,11 @@ export default function DialogPage(props) {
   const [lastMetadata, setLastMetadata] = useState(null);
   const [pdfUrl, setPdfUrl] = useState(initialPdfUrl || '');
 
+  // ── 대화 세션 ID (서버가 오래된 대화 요약을 세션별로 재사용) ──
+  const sessionIdRef = useRef(
+    `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`
+  );
+
   // ── Retrieval 패널 스크롤＋PDF 뷰어용 ref ──
   const pdfViewerRef = useRef(null);
 
@@ -127,6 +132,7 @@ export default function DialogPage(props) {
           chatbot_name: chatbotName,
           question,
           chat_history,
+          session_id: sessionIdRef.current,
         },
         { headers: { 'Content-Type': 'application/json' } }
       );